@@ -1,25 +1,15 @@
 import base64
 import json
-import os
+import threading
+import time
+from functools import wraps
 from http.server import BaseHTTPRequestHandler, HTTPServer
-from pathlib import Path
+from urllib.parse import parse_qs, urlparse
 
-import mysql.connector
-from dotenv import load_dotenv
-
-# Load environment variables
-root_path = Path(__file__).resolve().parent.parent
-load_dotenv(dotenv_path=root_path / ".env")
-
-DB_CONFIG = {
-    "host": os.getenv("DB_HOST"),
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "database": os.getenv("DB_NAME"),
-}
-
-API_USER = os.getenv("API_USER")
-API_PASS = os.getenv("API_PASS")
+from api.ledger import balance_history, get_ledger
+from api.search import DEFAULT_LIMIT, get_index, search_transactions
+from etl import config
+from etl.metrics import Metrics
 
 TABLE_ID_MAP = {
     "Deposit": "deposit_id",
@@ -29,237 +19,304 @@ TABLE_ID_MAP = {
 }
 
 
+# Request count, latency and DB time per route, served on /metrics
+metrics = Metrics()
+
+# DB time spent by the request currently handled on this thread
+request_state = threading.local()
+
+
+def timed_db(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            request_state.db_seconds = getattr(request_state, "db_seconds", 0.0) + time.perf_counter() - start
+    return wrapper
+
+
+def route_of(path):
+    # Collapse IDs so every transaction shares one "/transactions/<id>" series
+    path = urlparse(path).path
+    if path.startswith("/transactions/"):
+        return "/transactions/<id>"
+    if path in ("/transactions", "/search", "/balance-history", "/metrics"):
+        return path
+    return "other"
+
+
 # Database helper functions
 def get_db_connection():
-    return mysql.connector.connect(**DB_CONFIG)
+    return config.pooled_connection()
 
 
+@timed_db
 def fetch_all_transactions():
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    # Merge transactions from all tables
-    query = """
-    SELECT deposit_id AS transaction_id, customer_id, 'Deposit' AS type, amount, new_balance, time_stamp, readable_date
-    FROM Deposit
-    UNION ALL
-    SELECT withdraw_id AS transaction_id, customer_id, 'Withdrawal' AS type, amount, new_balance, time_stamp, readable_date
-    FROM Withdrawal
-    UNION ALL
-    SELECT transfer_id AS transaction_id, NULL AS customer_id, 'Transfer' AS type, amount, new_balance, NULL AS time_stamp, NULL AS readable_date
-    FROM Transfer
-    UNION ALL
-    SELECT payment_id AS transaction_id, NULL AS customer_id, 'Payment' AS type, amount, new_balance, time_stamp, readable_date
-    FROM Payment
-    """
-    cursor.execute(query)
-    results = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return results
-
-
+    try:
+        cursor = conn.cursor(dictionary=True)
+
+        # Merge transactions from all tables
+        query = """
+        SELECT deposit_id AS transaction_id, customer_id, 'Deposit' AS type, amount, new_balance, time_stamp, readable_date
+        FROM Deposit
+        UNION ALL
+        SELECT withdraw_id AS transaction_id, customer_id, 'Withdrawal' AS type, amount, new_balance, time_stamp, readable_date
+        FROM Withdrawal
+        UNION ALL
+        SELECT transfer_id AS transaction_id, NULL AS customer_id, 'Transfer' AS type, amount, new_balance, NULL AS time_stamp, NULL AS readable_date
+        FROM Transfer
+        UNION ALL
+        SELECT payment_id AS transaction_id, NULL AS customer_id, 'Payment' AS type, amount, new_balance, time_stamp, readable_date
+        FROM Payment
+        """
+        cursor.execute(query)
+        results = cursor.fetchall()
+        cursor.close()
+        return results
+    finally:
+        conn.close()
+
+
+@timed_db
 def fetch_transaction(transaction_id):
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor = conn.cursor(dictionary=True)
 
-    TABLE_ID_MAP = {
-        "Deposit": "deposit_id",
-        "Withdrawal": "withdraw_id",
-        "Transfer": "transfer_id",
-        "Payment": "payment_id"
-    }
+        TABLE_ID_MAP = {
+            "Deposit": "deposit_id",
+            "Withdrawal": "withdraw_id",
+            "Transfer": "transfer_id",
+            "Payment": "payment_id"
+        }
 
-    for table, id_field in TABLE_ID_MAP.items():
-        cursor.execute(f"SELECT * FROM {table} WHERE {id_field} = %s", (transaction_id,))
-        result = cursor.fetchone()
-        if result:
-            cursor.close()
-            conn.close()
-            return {"type": table, "data": result}
+        for table, id_field in TABLE_ID_MAP.items():
+            cursor.execute(f"SELECT * FROM {table} WHERE {id_field} = %s", (transaction_id,))
+            result = cursor.fetchone()
+            if result:
+                cursor.close()
+                return {"type": table, "data": result}
 
-    cursor.close()
-    conn.close()
-    return None
+        cursor.close()
+        return None
+    finally:
+        conn.close()
 
 
 
+@timed_db
 def insert_transaction(data):
     conn = get_db_connection()
-    cursor = conn.cursor()
-
-    table = data.get("type")
-    if table == "Deposit":
-        cursor.execute(
-            """
-            INSERT INTO Deposit (deposit_id, customer_id, amount, time_stamp, readable_date, new_balance)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            """,
-            (
-                data["transaction_id"],
-                data.get("customer_id"),
-                data["amount"],
-                data["time_stamp"],
-                data.get("readable_date"),
-                data.get("new_balance"),
-            ),
-        )
-    elif table == "Withdrawal":
-        cursor.execute(
-            """
-            INSERT INTO Withdrawal (withdraw_id, customer_id, agent_id, amount, fee, new_balance, time_stamp, readable_date)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-            (
-                data["transaction_id"],
-                data.get("customer_id"),
-                data.get("agent_id"),
-                data["amount"],
-                data.get("fee"),
-                data.get("new_balance"),
-                data["time_stamp"],
-                data.get("readable_date"),
-            ),
-        )
-    elif table == "Transfer":
-        cursor.execute(
-            """
-            INSERT INTO Transfer (transfer_id, sender_log_id, receiver_log_id, amount, fee, recipient_name, recipient_number, new_balance, transfer_type)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-            (
-                data["transaction_id"],
-                data.get("sender_log_id"),
-                data.get("receiver_log_id"),
-                data["amount"],
-                data.get("fee"),
-                data.get("recipient_name"),
-                data.get("recipient_number"),
-                data.get("new_balance"),
-                data.get("transfer_type"),
-            ),
-        )
-    elif table == "Payment":
-        print(data)
-        cursor.execute(
-            """
-            INSERT INTO Payment (payment_id, sender_log_id, receiver_log_id, amount, fee, new_balance, time_stamp, readable_date, payment_type)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-            (
-                data["transaction_id"],
-                data.get("sender_log_id"),
-                data.get("receiver_log_id"),
-                data["amount"],
-                data.get("fee"),
-                data.get("new_balance"),
-                data["time_stamp"],
-                data.get("readable_date"),
-                data.get("payment_type"),
-            ),
-        )
-    else:
-        raise ValueError("Unknown transaction type")
-
-    conn.commit()
-    cursor.close()
-    conn.close()
+    try:
+        cursor = conn.cursor()
+
+        table = data.get("type")
+        if table == "Deposit":
+            cursor.execute(
+                """
+                INSERT INTO Deposit (deposit_id, customer_id, amount, time_stamp, readable_date, new_balance)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                """,
+                (
+                    data["transaction_id"],
+                    data.get("customer_id"),
+                    data["amount"],
+                    data["time_stamp"],
+                    data.get("readable_date"),
+                    data.get("new_balance"),
+                ),
+            )
+        elif table == "Withdrawal":
+            cursor.execute(
+                """
+                INSERT INTO Withdrawal (withdraw_id, customer_id, agent_id, amount, fee, new_balance, time_stamp, readable_date)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                (
+                    data["transaction_id"],
+                    data.get("customer_id"),
+                    data.get("agent_id"),
+                    data["amount"],
+                    data.get("fee"),
+                    data.get("new_balance"),
+                    data["time_stamp"],
+                    data.get("readable_date"),
+                ),
+            )
+        elif table == "Transfer":
+            cursor.execute(
+                """
+                INSERT INTO Transfer (transfer_id, sender_log_id, receiver_log_id, amount, fee, recipient_name, recipient_number, new_balance, transfer_type)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                (
+                    data["transaction_id"],
+                    data.get("sender_log_id"),
+                    data.get("receiver_log_id"),
+                    data["amount"],
+                    data.get("fee"),
+                    data.get("recipient_name"),
+                    data.get("recipient_number"),
+                    data.get("new_balance"),
+                    data.get("transfer_type"),
+                ),
+            )
+        elif table == "Payment":
+            print(data)
+            cursor.execute(
+                """
+                INSERT INTO Payment (payment_id, sender_log_id, receiver_log_id, amount, fee, new_balance, time_stamp, readable_date, payment_type)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                (
+                    data["transaction_id"],
+                    data.get("sender_log_id"),
+                    data.get("receiver_log_id"),
+                    data["amount"],
+                    data.get("fee"),
+                    data.get("new_balance"),
+                    data["time_stamp"],
+                    data.get("readable_date"),
+                    data.get("payment_type"),
+                ),
+            )
+        else:
+            raise ValueError("Unknown transaction type")
 
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
 
+
+@timed_db
 def update_transaction(transaction_id, data):
     conn = get_db_connection()
-    cursor = conn.cursor()
-
-    table = data.get("type")
-    if table == "Deposit":
-        cursor.execute(
-            """
-            UPDATE Deposit SET customer_id=%s, amount=%s, new_balance=%s, time_stamp=%s, readable_date=%s
-            WHERE deposit_id=%s
-            """,
-            (
-                data.get("customer_id"),
-                data.get("amount"),
-                data.get("new_balance"),
-                data.get("time_stamp"),
-                data.get("readable_date"),
-                transaction_id,
-            ),
-        )
-    elif table == "Withdrawal":
-        cursor.execute(
-            """
-            UPDATE Withdrawal SET customer_id=%s, agent_id=%s, amount=%s, fee=%s, new_balance=%s, time_stamp=%s, readable_date=%s
-            WHERE withdraw_id=%s
-            """,
-            (
-                data.get("customer_id"),
-                data.get("agent_id"),
-                data.get("amount"),
-                data.get("fee"),
-                data.get("new_balance"),
-                data.get("time_stamp"),
-                data.get("readable_date"),
-                transaction_id,
-            ),
-        )
-    elif table == "Transfer":
-        cursor.execute(
-            """
-            UPDATE Transfer SET sender_log_id=%s, receiver_log_id=%s, amount=%s, fee=%s, recipient_name=%s, recipient_number=%s, new_balance=%s, transfer_type=%s
-            WHERE transfer_id=%s
-            """,
-            (
-                data.get("sender_log_id"),
-                data.get("receiver_log_id"),
-                data.get("amount"),
-                data.get("fee"),
-                data.get("recipient_name"),
-                data.get("recipient_number"),
-                data.get("new_balance"),
-                data.get("transfer_type"),
-                transaction_id,
-            ),
-        )
-    elif table == "Payment":
-        cursor.execute(
-            """
-            UPDATE Payment SET sender_log_id=%s, receiver_log_id=%s, amount=%s, fee=%s, new_balance=%s, time_stamp=%s, readable_date=%s, payment_type=%s
-            WHERE payment_id=%s
-            """,
-            (
-                data.get("sender_log_id"),
-                data.get("receiver_log_id"),
-                data.get("amount"),
-                data.get("fee"),
-                data.get("new_balance"),
-                data.get("time_stamp"),
-                data.get("readable_date"),
-                data.get("payment_type"),
-                transaction_id,
-            ),
-        )
-    else:
-        raise ValueError("Unknown transaction type")
-
-    conn.commit()
-    cursor.close()
-    conn.close()
+    try:
+        cursor = conn.cursor()
+
+        table = data.get("type")
+        if table == "Deposit":
+            cursor.execute(
+                """
+                UPDATE Deposit SET customer_id=%s, amount=%s, new_balance=%s, time_stamp=%s, readable_date=%s
+                WHERE deposit_id=%s
+                """,
+                (
+                    data.get("customer_id"),
+                    data.get("amount"),
+                    data.get("new_balance"),
+                    data.get("time_stamp"),
+                    data.get("readable_date"),
+                    transaction_id,
+                ),
+            )
+        elif table == "Withdrawal":
+            cursor.execute(
+                """
+                UPDATE Withdrawal SET customer_id=%s, agent_id=%s, amount=%s, fee=%s, new_balance=%s, time_stamp=%s, readable_date=%s
+                WHERE withdraw_id=%s
+                """,
+                (
+                    data.get("customer_id"),
+                    data.get("agent_id"),
+                    data.get("amount"),
+                    data.get("fee"),
+                    data.get("new_balance"),
+                    data.get("time_stamp"),
+                    data.get("readable_date"),
+                    transaction_id,
+                ),
+            )
+        elif table == "Transfer":
+            cursor.execute(
+                """
+                UPDATE Transfer SET sender_log_id=%s, receiver_log_id=%s, amount=%s, fee=%s, recipient_name=%s, recipient_number=%s, new_balance=%s, transfer_type=%s
+                WHERE transfer_id=%s
+                """,
+                (
+                    data.get("sender_log_id"),
+                    data.get("receiver_log_id"),
+                    data.get("amount"),
+                    data.get("fee"),
+                    data.get("recipient_name"),
+                    data.get("recipient_number"),
+                    data.get("new_balance"),
+                    data.get("transfer_type"),
+                    transaction_id,
+                ),
+            )
+        elif table == "Payment":
+            cursor.execute(
+                """
+                UPDATE Payment SET sender_log_id=%s, receiver_log_id=%s, amount=%s, fee=%s, new_balance=%s, time_stamp=%s, readable_date=%s, payment_type=%s
+                WHERE payment_id=%s
+                """,
+                (
+                    data.get("sender_log_id"),
+                    data.get("receiver_log_id"),
+                    data.get("amount"),
+                    data.get("fee"),
+                    data.get("new_balance"),
+                    data.get("time_stamp"),
+                    data.get("readable_date"),
+                    data.get("payment_type"),
+                    transaction_id,
+                ),
+            )
+        else:
+            raise ValueError("Unknown transaction type")
 
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
 
+
+@timed_db
 def delete_transaction(transaction_id):
     conn = get_db_connection()
-    cursor = conn.cursor()
+    try:
+        cursor = conn.cursor()
 
-    for table, id_field in TABLE_ID_MAP.items():
-        cursor.execute(f"DELETE FROM {table} WHERE {id_field}=%s", (transaction_id,))
+        for table, id_field in TABLE_ID_MAP.items():
+            cursor.execute(f"DELETE FROM {table} WHERE {id_field}=%s", (transaction_id,))
 
-    conn.commit()
-    cursor.close()
-    conn.close()
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
 
 # HTTP Request Handler
 class RequestHandler(BaseHTTPRequestHandler):
+    def handle_one_request(self):
+        start = time.perf_counter()
+        request_state.db_seconds = 0.0
+        self.status = None
+        self.raw_requestline = b""
+        failed = False
+        try:
+            super().handle_one_request()
+        except Exception:
+            failed = True
+            raise
+        finally:
+            # An empty request line means the client closed the connection
+            if self.raw_requestline:
+                # A handler that raised or never responded counts as a server error
+                status = 500 if failed or self.status is None else self.status
+                labels = {"method": self.command, "route": route_of(getattr(self, "path", ""))}
+                metrics.incr("requests", status=status, **labels)
+                metrics.observe("request_latency", time.perf_counter() - start, **labels)
+                metrics.observe("db_time", request_state.db_seconds, **labels)
+
+    def send_response(self, code, message=None):
+        self.status = code
+        super().send_response(code, message)
+
     def do_AUTHHEAD(self):
         self.send_response(401)
         self.send_header("WWW-Authenticate", 'Basic realm="SMS API"')
@@ -273,7 +330,7 @@ class RequestHandler(BaseHTTPRequestHandler):
         auth_type, encoded = auth_header.split(" ")
         decoded = base64.b64decode(encoded).decode("utf-8")
         user, passwd = decoded.split(":")
-        if user == API_USER and passwd == API_PASS:
+        if (user, passwd) == config.api_credentials():
             return True
         self.do_AUTHHEAD()
         return False
@@ -289,7 +346,29 @@ class RequestHandler(BaseHTTPRequestHandler):
         if not self.authenticate():
             return
 
-        if self.path.startswith("/transactions/"):
+        url = urlparse(self.path)
+        if url.path == "/search":
+            params = parse_qs(url.query)
+            query = params.get("q", [""])[0]
+            try:
+                limit = int(params.get("limit", [DEFAULT_LIMIT])[0])
+            except ValueError:
+                self.send_response(400)
+                self.end_headers()
+                self.wfile.write(b"Invalid limit")
+                return
+            try:
+                results = search_transactions(query, limit)
+            except FileNotFoundError:
+                self.send_response(503)
+                self.end_headers()
+                self.wfile.write(b"Search index not built")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps({"query": query, "count": len(results), "results": results}, default=str).encode())
+        elif self.path.startswith("/transactions/"):
             transaction_id = self.path.split("/")[-1]
             transaction = fetch_transaction(transaction_id)
             if transaction:
@@ -301,6 +380,38 @@ class RequestHandler(BaseHTTPRequestHandler):
                 self.send_response(404)
                 self.end_headers()
                 self.wfile.write(b"Transaction not found")
+        elif url.path == "/balance-history":
+            params = parse_qs(url.query)
+            try:
+                history = balance_history(
+                    params.get("account", [None])[0],
+                    params.get("from", [None])[0],
+                    params.get("to", [None])[0],
+                )
+            except FileNotFoundError:
+                self.send_response(503)
+                self.end_headers()
+                self.wfile.write(b"Balance ledger not built")
+                return
+            except ValueError as e:
+                self.send_response(400)
+                self.end_headers()
+                self.wfile.write(str(e).encode())
+                return
+            if history is None:
+                self.send_response(404)
+                self.end_headers()
+                self.wfile.write(b"Account not found")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps(history).encode())
+        elif url.path == "/metrics":
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps(metrics.snapshot()).encode())
         elif self.path == "/transactions":
             transactions = fetch_all_transactions()
             self.send_response(200)
@@ -352,8 +463,24 @@ class RequestHandler(BaseHTTPRequestHandler):
             self.end_headers()
 
 
+def prewarm():
+    # Pool filled, per-table lookups run once on every connection, search index and ledger loaded
+    queries = [(f"SELECT * FROM {table} WHERE {id_field} = %s", ("",)) for table, id_field in TABLE_ID_MAP.items()]
+    connections = config.prewarm(queries)
+    for load in (get_index, get_ledger):
+        try:
+            load()
+        except FileNotFoundError:
+            pass
+    print(f"Pre-warmed {connections} database connections")
+
+
 # Run the server
-def run(server_class=HTTPServer, handler_class=RequestHandler, port=8000):
+def run(server_class=HTTPServer, handler_class=RequestHandler, port=8000, warm=None):
+    if warm is None:
+        warm = config.get("API_PREWARM", "0") == "1"
+    if warm:
+        prewarm()
     server_address = ("", port)
     httpd = server_class(server_address, handler_class)
     print(f"Server running on http://localhost:{port}")
@@ -0,0 +1,93 @@
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from pathlib import Path
+
+root_path = Path(__file__).resolve().parent.parent
+LEDGER_PATH = root_path / "data" / "processed" / "balance_ledger.json"
+
+# Loaded on first request and reloaded when build_ledger rewrites the file
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def load_ledger(path=LEDGER_PATH):
+    global _ledger
+    mtime = os.stat(path).st_mtime_ns
+    with open(path, "r", encoding="utf-8") as f:
+        ledger = json.load(f)
+    ledger["path"] = path
+    ledger["mtime"] = mtime
+    _ledger = ledger
+    return _ledger
+
+
+def get_ledger():
+    ledger = _ledger
+    if ledger is None:
+        with _ledger_lock:
+            return _ledger or load_ledger()
+    try:
+        changed = os.stat(ledger["path"]).st_mtime_ns != ledger["mtime"]
+    except FileNotFoundError:
+        # Keep serving the last ledger if the file is removed
+        return ledger
+    if changed:
+        with _ledger_lock:
+            if _ledger is ledger:
+                return load_ledger(ledger["path"])
+            return _ledger
+    return ledger
+
+
+def is_date(value):
+    try:
+        date.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+
+def parse_bound(value, name, end=False):
+    # "2024-05-10" or "2024-05-10 16:30[:58]" (or with a "T") -> the
+    # "YYYY-MM-DD HH:MM:SS" form of the time_stamp column, so bisection compares
+    # like with like. A bare end date includes the whole day.
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid '{name}' date: {value!r}, expected YYYY-MM-DD or YYYY-MM-DD HH:MM:SS") from None
+    if moment.tzinfo is not None:
+        raise ValueError(f"Invalid '{name}' date: {value!r}, time zones are not supported")
+    if end and is_date(value):
+        moment = moment.replace(hour=23, minute=59, second=59)
+    return moment.isoformat(sep=" ", timespec="seconds")
+
+
+def balance_history(account=None, start=None, end=None):
+    # Ledger rows of one account between start and end (inclusive), found by
+    # binary search on the time-ordered time_stamp column
+    start = parse_bound(start, "from")
+    end = parse_bound(end, "to", end=True)
+    ledger = get_ledger()
+    accounts = ledger["accounts"]
+    if account is None:
+        if len(accounts) != 1:
+            raise ValueError("account is required when the ledger has several accounts")
+        account = next(iter(accounts))
+    if account not in accounts:
+        return None
+
+    columns = accounts[account]
+    time_stamps = columns["time_stamp"]
+    lo = bisect_left(time_stamps, start) if start else 0
+    hi = bisect_right(time_stamps, end) if end else len(time_stamps)
+
+    return {
+        "account": account,
+        "summary": ledger["summary"][account],
+        "entries": [{name: values[i] for name, values in columns.items()} for i in range(lo, hi)]
+    }
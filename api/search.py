@@ -0,0 +1,78 @@
+import json
+import os
+import re
+import threading
+from bisect import bisect_left
+from pathlib import Path
+
+root_path = Path(__file__).resolve().parent.parent
+INDEX_PATH = root_path / "data" / "processed" / "search_index.json"
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Loaded on first search and reloaded when build_search_index rewrites the file
+_index = None
+_index_lock = threading.Lock()
+
+
+def load_index(path=INDEX_PATH):
+    global _index
+    mtime = os.stat(path).st_mtime_ns
+    with open(path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    _index = {
+        "documents": index["documents"],
+        "terms": index["terms"],
+        "sorted_terms": sorted(index["terms"]),
+        "path": path,
+        "mtime": mtime
+    }
+    return _index
+
+
+def get_index():
+    index = _index
+    if index is None:
+        with _index_lock:
+            return _index or load_index()
+    try:
+        changed = os.stat(index["path"]).st_mtime_ns != index["mtime"]
+    except FileNotFoundError:
+        # Keep serving the last index if the file is removed
+        return index
+    if changed:
+        with _index_lock:
+            if _index is index:
+                return load_index(index["path"])
+            return _index
+    return index
+
+
+def match_prefix(index, prefix):
+    # All documents containing a term starting with prefix
+    sorted_terms = index["sorted_terms"]
+    matches = set()
+    pos = bisect_left(sorted_terms, prefix)
+    while pos < len(sorted_terms) and sorted_terms[pos].startswith(prefix):
+        matches.update(index["terms"][sorted_terms[pos]])
+        pos += 1
+    return matches
+
+
+def search_transactions(query, limit=DEFAULT_LIMIT):
+    index = get_index()
+    tokens = re.findall(r"[a-z0-9]+", query.lower())
+    if not tokens:
+        return []
+
+    # Every query word must prefix-match some term of the transaction
+    doc_ids = None
+    for token in tokens:
+        matches = match_prefix(index, token)
+        doc_ids = matches if doc_ids is None else doc_ids & matches
+        if not doc_ids:
+            return []
+
+    limit = max(1, min(limit, MAX_LIMIT))
+    return [index["documents"][i] for i in sorted(doc_ids)[:limit]]
@@ -0,0 +1,151 @@
+import argparse
+import gzip
+import random
+from datetime import datetime, timedelta, timezone
+from xml.sax.saxutils import quoteattr
+
+# MoMo backups are exported in Rwanda time
+KIGALI_TZ = timezone(timedelta(hours=2))
+START_MS = 1715351458724
+SELF_NUMBER = "36521838"
+
+NAMES = ["Jane Smith", "Samuel Carter", "Alex Doe", "Robert Brown", "Linda Green", "Eric Mugisha", "Aline Uwase", "Jean Bosco"]
+NUMBERS = ["250791666666", "250790777777", "250788999999", "250789888888", "250783456789", "250722123456"]
+AGENTS = [("Agent Sophia", "250790777777"), ("Agent Paul", "250788123123"), ("Agent Grace", "250781010101")]
+
+PROMO_SUFFIX = "Kanda*182*16# wiyandikishe muri poromosiyo ya BivaMoMotima, ugire amahirwe yo gutsindira ibihembo bishimishije."
+TRANSFER_SUFFIX = "Kugura ama inite cg interineti kuri MoMo, Kanda *182*2*1# .*EN#"
+
+# Relative frequency of each message type, roughly matching data/raw/momo.xml
+MESSAGE_WEIGHTS = {
+    "deposit": 15,
+    "withdrawal": 2,
+    "send": 35,
+    "receive": 5,
+    "payment": 40,
+    "other": 3
+}
+
+
+def transfer_fee(amount):
+    if amount <= 1000:
+        return 20
+    if amount <= 10000:
+        return 100
+    if amount <= 50000:
+        return 250
+    return 1500
+
+
+def readable(dt):
+    # "10 May 2024 4:30:58 PM", as written by the SMS backup app
+    return f"{dt.day} {dt:%b %Y} {dt.hour % 12 or 12}:{dt:%M:%S %p}"
+
+
+class SmsGenerator:
+    def __init__(self, seed=42):
+        self.rng = random.Random(seed)
+        self.balance = 0
+        self.date_ms = START_MS
+
+    def tx_id(self):
+        return str(self.rng.randint(10**10, 10**11 - 1))
+
+    def amount(self, low, high, step=100):
+        return self.rng.randrange(low, high + 1, step)
+
+    def next_message(self):
+        rng = self.rng
+        self.date_ms += rng.randint(60, 6 * 3600) * 1000
+        sent = datetime.fromtimestamp(self.date_ms / 1000 - rng.randint(3, 15), KIGALI_TZ)
+        at = sent.strftime("%Y-%m-%d %H:%M:%S")
+        kind = rng.choices(list(MESSAGE_WEIGHTS), weights=list(MESSAGE_WEIGHTS.values()))[0]
+
+        # Debits need money on the account, so top up first when it's too low
+        if kind in ("withdrawal", "send", "payment") and self.balance < 2000:
+            kind = rng.choice(["deposit", "receive"])
+
+        if kind == "deposit":
+            amount = self.amount(1000, 200000, 1000)
+            self.balance += amount
+            body = (f"*113*R*A bank deposit of {amount} RWF has been added to your mobile money account at {at}. "
+                    f"Your NEW BALANCE :{self.balance} RWF. Cash Deposit::CASH::::0::250795963036.Thank you for using MTN MobileMoney.*EN#")
+        elif kind == "withdrawal":
+            fee = 350
+            amount = self.amount(1000, max(1000, self.balance - fee), 1000)
+            self.balance -= amount + fee
+            agent, agent_number = rng.choice(AGENTS)
+            body = (f"You Abebe Chala CHEBUDIE (*********036) have via agent: {agent} ({agent_number}), withdrawn {amount} RWF "
+                    f"from your mobile money account: {SELF_NUMBER} at {at} and you can now collect your money in cash. "
+                    f"Your new balance: {self.balance} RWF. Fee paid: {fee} RWF. Message from agent: 1. Financial Transaction Id: {self.tx_id()}.")
+        elif kind == "send":
+            amount = self.amount(100, max(100, (self.balance - 1500) // 2))
+            fee = transfer_fee(amount)
+            self.balance -= amount + fee
+            body = (f"*165*S*{amount} RWF transferred to {rng.choice(NAMES)} ({rng.choice(NUMBERS)}) from {SELF_NUMBER} at {at} . "
+                    f"Fee was: {fee} RWF. New balance: {self.balance} RWF. {TRANSFER_SUFFIX}")
+        elif kind == "receive":
+            amount = self.amount(100, 50000)
+            self.balance += amount
+            body = (f"You have received {amount} RWF from {rng.choice(NAMES)} (*********{rng.randint(0, 999):03d}) on your mobile money account "
+                    f"at {at}. Message from sender: . Your new balance:{self.balance} RWF. Financial Transaction Id: {self.tx_id()}.")
+        elif kind == "payment":
+            amount = self.amount(100, max(100, self.balance // 2))
+            self.balance -= amount
+            body = (f"TxId: {self.tx_id()}. Your payment of {amount:,} RWF to {rng.choice(NAMES)} {rng.randint(10000, 99999)} "
+                    f"has been completed at {at}. Your new balance: {self.balance:,} RWF. Fee was 0 RWF.{PROMO_SUFFIX}")
+        else:
+            body = rng.choice([
+                f"<#> Dear Customer, your MTN MoMo application one-time password is :{rng.randint(1000, 9999)}.",
+                f"Yello!Umaze kugura {rng.choice([200, 500, 2000])}Rwf(1GB)/30days igura 2,000 RWF"
+            ])
+
+        received = datetime.fromtimestamp(self.date_ms / 1000, KIGALI_TZ)
+        attrs = {
+            "protocol": "0",
+            "address": "M-Money",
+            "date": str(self.date_ms),
+            "type": "1",
+            "subject": "null",
+            "body": body,
+            "toa": "null",
+            "sc_toa": "null",
+            "service_center": "+250788110381",
+            "read": "1",
+            "status": "-1",
+            "locked": "0",
+            "date_sent": str(int(sent.timestamp()) * 1000),
+            "sub_id": "6",
+            "readable_date": readable(received),
+            "contact_name": "(Unknown)"
+        }
+        return "  <sms " + " ".join(f"{k}={quoteattr(v)}" for k, v in attrs.items()) + " />\n"
+
+
+def write_backup(path, count, seed=42):
+    # Streams a synthetic <smses> backup to path without holding it in memory,
+    # gzip-compressed when path ends in .gz
+    generator = SmsGenerator(seed)
+    backup_set = "%08x-0000-4000-8000-%012x" % (seed & 0xFFFFFFFF, count)
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as f:
+        f.write("<?xml version='1.0' encoding='utf-8'?>\n")
+        f.write(f'<smses count="{count}" backup_set="{backup_set}" backup_date="{START_MS}" type="full">\n')
+        for _ in range(count):
+            f.write(generator.next_message())
+        f.write("</smses>\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a reproducible synthetic MoMo SMS backup.")
+    parser.add_argument("--count", type=int, default=10000, help="number of <sms> messages")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="data/raw/synthetic.xml", help="ends in .gz for a compressed backup")
+    args = parser.parse_args()
+
+    write_backup(args.output, args.count, args.seed)
+    print(f"{args.count} synthetic messages written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import HTTPServer
+from pathlib import Path
+from urllib.request import Request, urlopen
+
+from benchmarks.generate_sms import write_backup
+
+root_path = Path(__file__).resolve().parent.parent
+RESULTS_DIR = root_path / "benchmarks" / "results"
+MYSQL_SCHEMA = root_path / "database" / "database_setup.sql"
+SQLITE_SCHEMA = root_path / "database" / "sqlite_setup.sql"
+
+BENCH_USER = "bench"
+BENCH_PASS = "bench"
+
+
+def peak_rss_mb():
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def parse_worker(xml_path, json_path):
+    # Runs in a fresh process so peak RSS only covers parsing
+    from etl.parse_xml import parse_file
+
+    start = time.perf_counter()
+    data = parse_file(xml_path)
+    elapsed = time.perf_counter() - start
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    return elapsed, peak_rss_mb()
+
+
+def bench_parse(xml_path, json_path, messages):
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        elapsed, rss = pool.apply(parse_worker, (xml_path, json_path))
+    return {
+        "seconds": round(elapsed, 3),
+        "messages_per_sec": round(messages / elapsed),
+        "peak_rss_mb": round(rss, 1)
+    }
+
+
+def create_mysql_schema(cur, database):
+    # Recreates the scratch benchmark database; main() refuses the real DB_NAME one
+    cur.execute(f"DROP DATABASE IF EXISTS {database}")
+    cur.execute(f"CREATE DATABASE {database}")
+    cur.execute(f"USE {database}")
+    with open(MYSQL_SCHEMA, "r", encoding="utf-8") as f:
+        statements = f.read().split(";")
+    for statement in statements:
+        sql = "\n".join(line for line in statement.splitlines() if not line.strip().startswith("--")).strip()
+        if sql.upper().startswith("CREATE TABLE"):
+            cur.execute(sql)
+
+
+def is_sqlite_file(path):
+    with open(path, "rb") as f:
+        header = f.read(16)
+    return header in (b"", b"SQLite format 3\x00")
+
+
+def connect(args, workdir):
+    if args.backend == "sqlite":
+        path = args.sqlite_path or os.path.join(workdir, "bench.sqlite3")
+        # Every scale starts from an empty database, otherwise INSERT OR IGNORE
+        # skips rows a previous scale or run already loaded
+        if os.path.exists(path):
+            if not is_sqlite_file(path):
+                raise ValueError(f"{path} exists and is not a SQLite database, refusing to replace it")
+            os.remove(path)
+        conn = sqlite3.connect(path)
+        with open(SQLITE_SCHEMA, "r", encoding="utf-8") as f:
+            conn.executescript(f.read())
+        return conn
+
+    from etl import config
+
+    conn = config.connect(database=None)
+    cur = conn.cursor()
+    create_mysql_schema(cur, args.mysql_database)
+    cur.close()
+    return conn
+
+
+def bench_load(args, json_path, workdir):
+    from etl.load_json_to_mysql import TABLE_COLUMNS, load
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    conn = connect(args, workdir)
+    start = time.perf_counter()
+    counts = load(data, conn, args.backend)
+    elapsed = time.perf_counter() - start
+    conn.close()
+    # rows counts inserted rows only; skipped ones were ignored by the database
+    rows = sum(counts.values())
+    return {
+        "seconds": round(elapsed, 3),
+        "rows": rows,
+        "skipped_rows": sum(len(data[table]) for table in TABLE_COLUMNS) - rows,
+        "rows_per_sec": round(rows / elapsed) if elapsed else None,
+        "rows_per_table": counts
+    }, data
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+
+    def pick(p):
+        return round(samples[min(len(samples) - 1, int(len(samples) * p))] * 1000, 3)
+
+    return {"requests": len(samples), "p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": pick(1.0)}
+
+
+def time_requests(base_url, paths):
+    token = base64.b64encode(f"{BENCH_USER}:{BENCH_PASS}".encode()).decode()
+    samples = []
+    for path in paths:
+        request = Request(base_url + path, headers={"Authorization": f"Basic {token}"})
+        start = time.perf_counter()
+        with urlopen(request) as response:
+            response.read()
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def bench_api(args, data, workdir):
+    from api import app, search
+    from etl.build_search_index import build_index
+
+    index_path = os.path.join(workdir, "search_index.json")
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(build_index(data), f)
+    search.load_index(index_path)
+
+    # Environment variables take precedence over .env, see etl/config.py
+    os.environ["API_USER"], os.environ["API_PASS"] = BENCH_USER, BENCH_PASS
+    if args.backend == "mysql":
+        os.environ["DB_NAME"] = args.mysql_database
+
+    class QuietHandler(app.RequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    names = ["jane", "samuel carter", "2507907", "alex d", "linda"]
+    results = {"search": time_requests(base_url, [f"/search?q={names[i % len(names)].replace(' ', '+')}" for i in range(args.api_requests)])}
+
+    # Transaction endpoints read MySQL directly, so they are only measured against it
+    if args.backend == "mysql":
+        ids = [p["payment_id"] for p in data["Payment"][:args.api_requests]] or ["P00001"]
+        results["get_transaction"] = time_requests(base_url, [f"/transactions/{ids[i % len(ids)]}" for i in range(args.api_requests)])
+        results["list_transactions"] = time_requests(base_url, ["/transactions"] * 3)
+
+    server.shutdown()
+    server.server_close()
+    return results
+
+
+def run_scale(args, messages):
+    with tempfile.TemporaryDirectory() as workdir:
+        xml_path = os.path.join(workdir, "momo.xml")
+        json_path = os.path.join(workdir, "formatted_data.json")
+
+        start = time.perf_counter()
+        write_backup(xml_path, messages, args.seed)
+        result = {
+            "messages": messages,
+            "xml_mb": round(os.path.getsize(xml_path) / (1024 * 1024), 1),
+            "generate_seconds": round(time.perf_counter() - start, 3),
+            "parse": bench_parse(xml_path, json_path, messages)
+        }
+        result["load"], data = bench_load(args, json_path, workdir)
+        if args.api_requests:
+            result["api"] = bench_api(args, data, workdir)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the MoMo ETL pipeline and API.")
+    parser.add_argument("--scales", default="10000,100000", help="comma separated message counts, e.g. 10000,1000000")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--sqlite-path", help="SQLite file to load into, replaced for every scale (default: a temporary file)")
+    parser.add_argument("--mysql-database", default="momo_benchmark", help="scratch MySQL database, dropped and recreated on every run")
+    parser.add_argument("--api-requests", type=int, default=200, help="requests per API endpoint, 0 to skip")
+    parser.add_argument("--output-dir", default=str(RESULTS_DIR))
+    args = parser.parse_args()
+
+    if args.backend == "mysql":
+        from etl import config
+
+        # Checked before bench_api points DB_NAME at the scratch database
+        database = config.get("DB_NAME")
+        if database and args.mysql_database.lower() == database.lower():
+            parser.error(f"--mysql-database {args.mysql_database} is the DB_NAME database and would be dropped, pick a scratch name")
+
+    report = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "seed": args.seed,
+        "backend": args.backend,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scales": []
+    }
+    for messages in (int(s) for s in args.scales.split(",")):
+        print(f"Benchmarking {messages} messages...")
+        result = run_scale(args, messages)
+        print(json.dumps(result, indent=2))
+        report["scales"].append(result)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, f"{datetime.now():%Y%m%d-%H%M%S}-{args.backend}.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark results written to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+-- SQLite version of database_setup.sql, used for local runs and benchmarks
+-- (no ENUM or display widths; duplicate keys are skipped with INSERT OR IGNORE)
+
+-- Customer Table
+CREATE TABLE IF NOT EXISTS Customer (
+    customer_id VARCHAR(50) PRIMARY KEY,
+    customer_name VARCHAR(50) NOT NULL,
+    customer_number INTEGER UNIQUE NOT NULL
+);
+
+-- Agent Table
+CREATE TABLE IF NOT EXISTS Agent (
+    agent_id VARCHAR(50) PRIMARY KEY,
+    agent_name VARCHAR(50) NOT NULL,
+    agent_number INTEGER UNIQUE NOT NULL
+);
+
+-- Deposit Table
+CREATE TABLE IF NOT EXISTS Deposit (
+    deposit_id VARCHAR(50) PRIMARY KEY,
+    customer_id VARCHAR(50),
+    amount REAL NOT NULL,
+    time_stamp DATETIME NOT NULL,
+    readable_date VARCHAR(50),
+    new_balance REAL,
+    FOREIGN KEY (customer_id) REFERENCES Customer(customer_id)
+);
+
+-- Withdrawal Table
+CREATE TABLE IF NOT EXISTS Withdrawal (
+    withdraw_id VARCHAR(50) PRIMARY KEY,
+    agent_id VARCHAR(50),
+    customer_id VARCHAR(50),
+    amount REAL NOT NULL,
+    fee REAL,
+    new_balance REAL,
+    time_stamp DATETIME NOT NULL,
+    readable_date VARCHAR(50),
+    FOREIGN KEY (agent_id) REFERENCES Agent(agent_id),
+    FOREIGN KEY (customer_id) REFERENCES Customer(customer_id)
+);
+
+-- Sender Log Table
+CREATE TABLE IF NOT EXISTS Sender_Log (
+    sender_log_id VARCHAR(50) PRIMARY KEY,
+    customer_id VARCHAR(50),
+    transaction_type VARCHAR(10) NOT NULL CHECK (transaction_type IN ('Payment', 'Transfer')),
+    FOREIGN KEY (customer_id) REFERENCES Customer(customer_id)
+);
+
+-- Receiver Log Table
+CREATE TABLE IF NOT EXISTS Receiver_Log (
+    receiver_log_id VARCHAR(50) PRIMARY KEY,
+    customer_id VARCHAR(50),
+    transaction_type VARCHAR(10) NOT NULL CHECK (transaction_type IN ('Payment', 'Transfer')),
+    FOREIGN KEY (customer_id) REFERENCES Customer(customer_id)
+);
+
+-- Transfer Table
+CREATE TABLE IF NOT EXISTS Transfer (
+    transfer_id VARCHAR(50) PRIMARY KEY,
+    receiver_log_id VARCHAR(50),
+    sender_log_id VARCHAR(50),
+    amount REAL NOT NULL,
+    fee REAL,
+    recipient_name VARCHAR(50),
+    recipient_number INTEGER,
+    new_balance REAL,
+    transfer_type VARCHAR(10) CHECK (transfer_type IN ('Receive', 'Send')),
+    FOREIGN KEY (receiver_log_id) REFERENCES Receiver_Log(receiver_log_id),
+    FOREIGN KEY (sender_log_id) REFERENCES Sender_Log(sender_log_id)
+);
+
+-- Payment Table
+CREATE TABLE IF NOT EXISTS Payment (
+    payment_id VARCHAR(50) PRIMARY KEY,
+    receiver_log_id VARCHAR(50),
+    sender_log_id VARCHAR(50),
+    amount REAL NOT NULL,
+    fee REAL,
+    new_balance REAL,
+    time_stamp DATETIME NOT NULL,
+    readable_date VARCHAR(50),
+    payment_type VARCHAR(10) CHECK (payment_type IN ('Bill', 'Utility', 'Airtime', 'Data', 'Merchant')),
+    FOREIGN KEY (receiver_log_id) REFERENCES Receiver_Log(receiver_log_id),
+    FOREIGN KEY (sender_log_id) REFERENCES Sender_Log(sender_log_id)
+);
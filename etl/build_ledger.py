@@ -0,0 +1,136 @@
+import json
+import os
+import time
+
+from etl.metrics import log_stage, profiled
+
+# Paths
+JSON_PATH = os.path.join("data", "processed", "formatted_data.json")
+LEDGER_PATH = os.path.join("data", "processed", "balance_ledger.json")
+
+# Reported balances are whole RWF; allow for float rounding only
+BALANCE_TOLERANCE = 0.5
+
+# Transaction types whose SMS reports the fee charged
+FEE_TYPES = {"Withdrawal", "Transfer_Send", "Payment"}
+
+LEDGER_COLUMNS = ["time_stamp", "transaction_id", "type", "amount", "fee", "delta", "expected_balance", "reported_balance", "difference", "gap", "fee_anomaly"]
+
+
+def ledger_entries(data):
+    # One entry per transaction with the account it belongs to and its signed effect on the balance
+    sender_logs = {sl["sender_log_id"]: sl["customer_id"] for sl in data["Sender_Log"]}
+    receiver_logs = {rl["receiver_log_id"]: rl["customer_id"] for rl in data["Receiver_Log"]}
+
+    for dep in data["Deposit"]:
+        yield dep["customer_id"], dep["time_stamp"], dep.get("date_ms"), dep["deposit_id"], "Deposit", dep["amount"], None, dep["new_balance"]
+    for wd in data["Withdrawal"]:
+        yield wd["customer_id"], wd["time_stamp"], wd.get("date_ms"), wd["withdraw_id"], "Withdrawal", wd["amount"], wd["fee"], wd["new_balance"]
+    for tr in data["Transfer"]:
+        if tr["transfer_type"] == "Send":
+            yield sender_logs.get(tr["sender_log_id"]), tr.get("time_stamp"), tr.get("date_ms"), tr["transfer_id"], "Transfer_Send", tr["amount"], tr["fee"], tr["new_balance"]
+        else:
+            yield receiver_logs.get(tr["receiver_log_id"]), tr.get("time_stamp"), tr.get("date_ms"), tr["transfer_id"], "Transfer_Receive", tr["amount"], tr["fee"], tr["new_balance"]
+    for pay in data["Payment"]:
+        yield sender_logs.get(pay["sender_log_id"]), pay["time_stamp"], pay.get("date_ms"), pay["payment_id"], "Payment", pay["amount"], pay["fee"], pay["new_balance"]
+
+
+def signed_delta(tx_type, amount, fee):
+    # None when the SMS amount couldn't be parsed
+    if amount is None:
+        return None
+    if tx_type in ("Deposit", "Transfer_Receive"):
+        return amount
+    return -(amount + (fee or 0))
+
+
+def build_ledger(data):
+    # Time-ordered ledger per account, as columns, with expected vs reported balances
+    entries = []
+    skipped = 0
+    for order, (account, time_stamp, date_ms, transaction_id, tx_type, amount, fee, reported) in enumerate(ledger_entries(data)):
+        if account is None or time_stamp is None:
+            skipped += 1
+            continue
+        # time_stamp only has whole seconds; the SMS date in ms orders
+        # messages received within the same second
+        entries.append((account, time_stamp, date_ms or 0, order, transaction_id, tx_type, amount, fee, reported))
+    entries.sort()
+
+    accounts = {}
+    previous = {}
+    for account, time_stamp, _, _, transaction_id, tx_type, amount, fee, reported in entries:
+        columns = accounts.setdefault(account, {name: [] for name in LEDGER_COLUMNS})
+        delta = signed_delta(tx_type, amount, fee)
+        expected = previous[account] + delta if previous.get(account) is not None and delta is not None else None
+        difference = reported - expected if expected is not None and reported is not None else None
+        gap = difference is not None and abs(difference) > BALANCE_TOLERANCE
+        # A missing or negative fee, or a balance that only reconciles with the
+        # fee left out or charged twice, means the reported fee doesn't match
+        fee_anomaly = tx_type in FEE_TYPES and (
+            fee is None or fee < 0
+            or (gap and fee > 0 and abs(abs(difference) - fee) <= BALANCE_TOLERANCE)
+        )
+        row = {
+            "time_stamp": time_stamp,
+            "transaction_id": transaction_id,
+            "type": tx_type,
+            "amount": amount,
+            "fee": fee,
+            "delta": delta,
+            "expected_balance": expected,
+            "reported_balance": reported,
+            "difference": difference,
+            "gap": gap,
+            "fee_anomaly": fee_anomaly
+        }
+        for name in LEDGER_COLUMNS:
+            columns[name].append(row[name])
+        if reported is not None:
+            previous[account] = reported
+        elif expected is not None:
+            previous[account] = expected
+        else:
+            # Neither amount nor balance known: the next row can't be checked
+            previous[account] = None
+
+    summary = {
+        account: {
+            "entries": len(columns["time_stamp"]),
+            "gaps": sum(columns["gap"]),
+            "fee_anomalies": sum(columns["fee_anomaly"]),
+            "first": columns["time_stamp"][0],
+            "last": columns["time_stamp"][-1],
+            "closing_balance": previous.get(account)
+        }
+        for account, columns in accounts.items()
+    }
+    return {"accounts": accounts, "summary": summary, "skipped": skipped}
+
+
+def main():
+    with profiled("build_ledger"):
+        with open(JSON_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        start = time.perf_counter()
+        ledger = build_ledger(data)
+        elapsed = time.perf_counter() - start
+        for account, summary in ledger["summary"].items():
+            log_stage("ledger", account=account, **summary)
+        log_stage("ledger", accounts=len(ledger["accounts"]), skipped=ledger["skipped"], seconds=elapsed)
+
+        # Swapped in whole, so a running API that reloads it on change never
+        # reads a half-written file
+        tmp_path = LEDGER_PATH + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(ledger, f, ensure_ascii=False)
+        os.replace(tmp_path, LEDGER_PATH)
+
+    for account, summary in ledger["summary"].items():
+        print(f"{account}: {summary['entries']} entries, {summary['gaps']} balance gaps, {summary['fee_anomalies']} fee anomalies")
+    print(f"Balance ledger written to {LEDGER_PATH}")
+
+
+if __name__ == "__main__":
+    main()
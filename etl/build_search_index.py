@@ -0,0 +1,96 @@
+import json
+import os
+import re
+import time
+from collections import defaultdict
+
+from etl.metrics import log_stage, profiled
+
+# Paths
+JSON_PATH = os.path.join("data", "processed", "formatted_data.json")
+INDEX_PATH = os.path.join("data", "processed", "search_index.json")
+
+# Primary key column of each transaction table
+TABLE_ID_MAP = {
+    "Deposit": "deposit_id",
+    "Withdrawal": "withdraw_id",
+    "Transfer": "transfer_id",
+    "Payment": "payment_id"
+}
+
+
+def tokenize(text):
+    # Lowercased alphanumeric words, so "Jane Smith (250791666666)" -> ["jane", "smith", "250791666666"]
+    return re.findall(r"[a-z0-9]+", str(text).lower()) if text is not None else []
+
+
+def counterparty(table, row, customers, agents, sender_logs, receiver_logs):
+    # Returns (name, number) of the other side of a transaction
+    if table == "Withdrawal":
+        agent = agents.get(row.get("agent_id"), {})
+        return agent.get("agent_name"), agent.get("agent_number")
+    if table == "Transfer":
+        if row.get("transfer_type") == "Send":
+            return row.get("recipient_name"), row.get("recipient_number")
+        customer = customers.get(sender_logs.get(row.get("sender_log_id")), {})
+        return customer.get("customer_name"), customer.get("customer_number")
+    if table == "Payment":
+        customer = customers.get(receiver_logs.get(row.get("receiver_log_id")), {})
+        return customer.get("customer_name"), customer.get("customer_number")
+    return None, None
+
+
+def build_index(data):
+    customers = {c["customer_id"]: c for c in data["Customer"]}
+    agents = {a["agent_id"]: a for a in data["Agent"]}
+    sender_logs = {sl["sender_log_id"]: sl["customer_id"] for sl in data["Sender_Log"]}
+    receiver_logs = {rl["receiver_log_id"]: rl["customer_id"] for rl in data["Receiver_Log"]}
+
+    documents = []
+    terms = defaultdict(set)
+    for table, id_field in TABLE_ID_MAP.items():
+        for row in data[table]:
+            name, number = counterparty(table, row, customers, agents, sender_logs, receiver_logs)
+            doc = {
+                "transaction_id": row[id_field],
+                "type": table,
+                "counterparty_name": name,
+                "counterparty_number": number,
+                "tx_id": row.get("tx_id"),
+                "amount": row.get("amount"),
+                "time_stamp": row.get("time_stamp")
+            }
+            doc_idx = len(documents)
+            documents.append(doc)
+            for field in ("transaction_id", "counterparty_name", "counterparty_number", "tx_id"):
+                for term in tokenize(doc[field]):
+                    terms[term].add(doc_idx)
+
+    # Sorted terms let the API answer prefix queries with a binary search
+    return {
+        "documents": documents,
+        "terms": {term: sorted(terms[term]) for term in sorted(terms)}
+    }
+
+
+def main():
+    with profiled("build_search_index"):
+        with open(JSON_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        start = time.perf_counter()
+        index = build_index(data)
+        log_stage("search_index", documents=len(index["documents"]), terms=len(index["terms"]), seconds=time.perf_counter() - start)
+
+        # Written to a temporary file and swapped in, so a running API that
+        # reloads the index on change never reads a half-written file
+        tmp_path = INDEX_PATH + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp_path, INDEX_PATH)
+
+    print(f"Search index with {len(index['documents'])} transactions and {len(index['terms'])} terms written to {INDEX_PATH}")
+
+
+if __name__ == "__main__":
+    main()
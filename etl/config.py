@@ -0,0 +1,86 @@
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+# Central configuration shared by the ETL scripts and the API. Nothing here
+# touches .env, the MySQL driver or the network until a value is first needed.
+
+root_path = Path(__file__).resolve().parent.parent
+ENV_PATH = root_path / ".env"
+
+DEFAULT_POOL_SIZE = 5
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def load_env():
+    # Variables already set in the environment win over .env
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=ENV_PATH)
+
+
+def get(name, default=None):
+    load_env()
+    return os.getenv(name, default)
+
+
+def db_config():
+    return {
+        "host": get("DB_HOST"),
+        "user": get("DB_USER"),
+        "password": get("DB_PASSWORD"),
+        "database": get("DB_NAME")
+    }
+
+
+def api_credentials():
+    return get("API_USER"), get("API_PASS")
+
+
+def connect(**overrides):
+    # Plain connection for short-lived ETL jobs
+    import mysql.connector
+    return mysql.connector.connect(**{**db_config(), **overrides})
+
+
+def get_pool():
+    # Connection pool for the API, created (and filled) on first use
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from mysql.connector import pooling
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name="momo_api",
+                    pool_size=int(get("DB_POOL_SIZE", DEFAULT_POOL_SIZE)),
+                    **db_config()
+                )
+    return _pool
+
+
+def pooled_connection():
+    # close() on the returned connection hands it back to the pool
+    return get_pool().get_connection()
+
+
+def prewarm(queries=()):
+    # Fills the pool and runs each query once on every pooled connection so the
+    # first real requests don't pay for connecting or cold server caches
+    pool = get_pool()
+    conns = []
+    try:
+        for _ in range(pool.pool_size):
+            conns.append(pool.get_connection())
+        for conn in conns:
+            cursor = conn.cursor()
+            for query, params in queries:
+                cursor.execute(query, params)
+                cursor.fetchall()
+            cursor.close()
+    finally:
+        for conn in conns:
+            conn.close()
+    return len(conns)
@@ -1,86 +1,81 @@
 import json
-from dotenv import load_dotenv
-import os
-import mysql.connector
-
-load_dotenv()
-
-# Update these with your MySQL credentials
-MYSQL_CONFIG = {
-    "host": os.getenv("DB_HOST"),
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "database": os.getenv("DB_NAME")
-}
+import time
+
+from etl import config
+from etl.metrics import Metrics, log_stage, profiled
 
 JSON_PATH = "data/processed/formatted_data.json"
 
-# Load JSON data
-with open(JSON_PATH, "r", encoding="utf-8") as f:
-    data = json.load(f)
-
-# Connect to MySQL
-conn = mysql.connector.connect(**MYSQL_CONFIG)
-cur = conn.cursor()
-
-# Insert Customers
-for cust in data["Customer"]:
-    cur.execute(
-        "INSERT IGNORE INTO Customer (customer_id, customer_name, customer_number) VALUES (%s, %s, %s)",
-        (cust["customer_id"], cust["customer_name"], cust["customer_number"])
-    )
-
-# Insert Agents
-for agent in data["Agent"]:
-    cur.execute(
-        "INSERT IGNORE INTO Agent (agent_id, agent_name, agent_number) VALUES (%s, %s, %s)",
-        (agent["agent_id"], agent["agent_name"], agent["agent_number"])
-    )
-
-# Insert Deposits
-for dep in data["Deposit"]:
-    cur.execute(
-        "INSERT IGNORE INTO Deposit (deposit_id, customer_id, amount, time_stamp, readable_date, new_balance) VALUES (%s, %s, %s, %s, %s, %s)",
-        (dep["deposit_id"], dep["customer_id"], dep["amount"], dep["time_stamp"], dep["readable_date"], dep["new_balance"])
-    )
-
-# Insert Withdrawals
-for wd in data["Withdrawal"]:
-    cur.execute(
-        "INSERT IGNORE INTO Withdrawal (withdraw_id, agent_id, customer_id, amount, fee, new_balance, time_stamp, readable_date) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
-        (wd["withdraw_id"], wd["agent_id"], wd["customer_id"], wd["amount"], wd["fee"], wd["new_balance"], wd["time_stamp"], wd["readable_date"])
-    )
-
-# Insert Sender_Log
-for sl in data["Sender_Log"]:
-    cur.execute(
-        "INSERT IGNORE INTO Sender_Log (sender_log_id, customer_id, transaction_type) VALUES (%s, %s, %s)",
-        (sl["sender_log_id"], sl["customer_id"], sl["transaction_type"])
-    )
-
-# Insert Receiver_Log
-for rl in data["Receiver_Log"]:
-    cur.execute(
-        "INSERT IGNORE INTO Receiver_Log (receiver_log_id, customer_id, transaction_type) VALUES (%s, %s, %s)",
-        (rl["receiver_log_id"], rl["customer_id"], rl["transaction_type"])
-    )
-
-# Insert Transfers
-for tr in data["Transfer"]:
-    cur.execute(
-        "INSERT IGNORE INTO Transfer (transfer_id, receiver_log_id, sender_log_id, amount, fee, recipient_name, recipient_number, new_balance, transfer_type) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
-        (tr["transfer_id"], tr["receiver_log_id"], tr["sender_log_id"], tr["amount"], tr["fee"], tr["recipient_name"], tr["recipient_number"], tr["new_balance"], tr["transfer_type"])
-    )
-
-# Insert Payments
-for pay in data["Payment"]:
-    cur.execute(
-        "INSERT IGNORE INTO Payment (payment_id, receiver_log_id, sender_log_id, amount, fee, new_balance, time_stamp, readable_date, payment_type) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
-        (pay["payment_id"], pay["receiver_log_id"], pay["sender_log_id"], pay["amount"], pay["fee"], pay["new_balance"], pay["time_stamp"], pay["readable_date"], pay["payment_type"])
-    )
-
-conn.commit()
-cur.close()
-conn.close()
-
-print("Data loaded successfully into MySQL database.")
\ No newline at end of file
+# Rows sent per executemany call
+BATCH_SIZE = 1000
+
+# Batch insert latency and rows per table of the current run
+metrics = Metrics()
+
+# Columns to insert for each table, in foreign key order
+TABLE_COLUMNS = {
+    "Customer": ["customer_id", "customer_name", "customer_number"],
+    "Agent": ["agent_id", "agent_name", "agent_number"],
+    "Deposit": ["deposit_id", "customer_id", "amount", "time_stamp", "readable_date", "new_balance"],
+    "Withdrawal": ["withdraw_id", "agent_id", "customer_id", "amount", "fee", "new_balance", "time_stamp", "readable_date"],
+    "Sender_Log": ["sender_log_id", "customer_id", "transaction_type"],
+    "Receiver_Log": ["receiver_log_id", "customer_id", "transaction_type"],
+    "Transfer": ["transfer_id", "receiver_log_id", "sender_log_id", "amount", "fee", "recipient_name", "recipient_number", "new_balance", "transfer_type"],
+    "Payment": ["payment_id", "receiver_log_id", "sender_log_id", "amount", "fee", "new_balance", "time_stamp", "readable_date", "payment_type"]
+}
+
+
+def insert_statement(table, columns, dialect="mysql"):
+    # MySQL and SQLite spell "skip duplicate keys" and placeholders differently
+    if dialect == "sqlite":
+        verb, placeholder = "INSERT OR IGNORE", "?"
+    else:
+        verb, placeholder = "INSERT IGNORE", "%s"
+    return f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join([placeholder] * len(columns))})"
+
+
+def load(data, conn, dialect="mysql"):
+    # Inserts every table of the formatted data and returns the rows actually
+    # inserted per table; rows ignored as duplicates or for violating a
+    # constraint (e.g. a NULL customer_number) are logged as skipped
+    cur = conn.cursor()
+    counts = {}
+    for table, columns in TABLE_COLUMNS.items():
+        statement = insert_statement(table, columns, dialect)
+        rows = [tuple(row[col] for col in columns) for row in data[table]]
+        inserted = 0
+        start = time.perf_counter()
+        for i in range(0, len(rows), BATCH_SIZE):
+            with metrics.timer("insert_batch", table=table):
+                cur.executemany(statement, rows[i:i + BATCH_SIZE])
+            inserted += max(cur.rowcount, 0)
+        elapsed = time.perf_counter() - start
+        counts[table] = inserted
+        metrics.incr("rows", inserted, table=table)
+        log_stage("load", table=table, rows=inserted, skipped=len(rows) - inserted, batches=-(-len(rows) // BATCH_SIZE), seconds=elapsed, rows_per_sec=round(inserted / elapsed) if elapsed else 0)
+    start = time.perf_counter()
+    conn.commit()
+    log_stage("load", commit_seconds=time.perf_counter() - start)
+    cur.close()
+    return counts
+
+
+def main():
+    with profiled("load_json_to_mysql"):
+        # Load JSON data
+        with open(JSON_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        # Connect to MySQL (credentials come from .env, see etl/config.py)
+        conn = config.connect()
+        load(data, conn)
+        conn.close()
+
+        for key, hist in metrics.snapshot()["histograms"].items():
+            log_stage("load", metric=key, batches=hist["count"], avg_ms=hist["avg_ms"])
+
+    print("Data loaded successfully into MySQL database.")
+
+
+if __name__ == "__main__":
+    main()
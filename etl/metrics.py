@@ -0,0 +1,165 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from etl import config
+
+root_path = Path(__file__).resolve().parent.parent
+LOG_PATH = root_path / "data" / "logs" / "etl.log"
+
+# Upper bounds (ms) of the latency histogram buckets
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+
+def metric_key(name, labels):
+    # ("insert_batch", (("table", "Payment"),)) -> "insert_batch{table=Payment}"
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+
+def format_fields(fields):
+    # Structured log line: key=value pairs, quoting values with spaces, quotes
+    # or "=" and escaping backslashes, quotes and newlines inside them
+    parts = []
+    for key, value in fields.items():
+        if isinstance(value, float):
+            value = f"{value:.4f}"
+        value = str(value)
+        if not value or any(c in value for c in ' "=\\\n'):
+            value = '"' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        parts.append(f"{key}={value}")
+    return " ".join(parts)
+
+
+def get_logger():
+    logger = logging.getLogger("momo.etl")
+    if not logger.handlers:
+        os.makedirs(LOG_PATH.parent, exist_ok=True)
+        handler = logging.FileHandler(LOG_PATH, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def log_stage(stage, **fields):
+    get_logger().info(format_fields({"stage": stage, **fields}))
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum_ms": round(self.total, 3),
+            "avg_ms": round(self.total / self.count, 3) if self.count else None,
+            "buckets": {("+Inf" if bound == float("inf") else str(bound)): n for bound, n in zip(self.buckets, self.counts)}
+        }
+
+
+# Thread-safe counters and latency histograms, keyed by name and labels
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.histograms = defaultdict(Histogram)
+
+    def incr(self, name, value=1, **labels):
+        with self.lock:
+            self.counters[(name, tuple(sorted(labels.items())))] += value
+
+    def observe(self, name, seconds, **labels):
+        with self.lock:
+            self.histograms[(name, tuple(sorted(labels.items())))].observe(seconds * 1000)
+
+    def counter_values(self, name):
+        # [(labels, value)] of every counter recorded under name
+        with self.lock:
+            return [(dict(labels), value) for (key, labels), value in self.counters.items() if key == name]
+
+    def export_counters(self):
+        # Picklable [(name, labels, value)], e.g. to send a worker's counters to the parent
+        with self.lock:
+            return [(key, dict(labels), value) for (key, labels), value in self.counters.items()]
+
+    def merge_counters(self, counters):
+        for name, labels, value in counters:
+            self.incr(name, value, **labels)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "counters": {metric_key(*key): value for key, value in self.counters.items()},
+                "histograms": {metric_key(*key): hist.snapshot() for key, hist in self.histograms.items()}
+            }
+
+
+# Opt-in profiling of a whole run, enabled with MOMO_PROFILE=cpu, mem or cpu,mem
+# (in the environment or .env).
+# cProfile stats and a text summary of the hottest functions are written next
+# to etl.log; peak memory and the top allocation sites are logged to it.
+@contextmanager
+def profiled(run_name):
+    modes = {m.strip() for m in config.get("MOMO_PROFILE", "").lower().split(",") if m.strip()}
+    if not modes:
+        yield
+        return
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    profiler = cProfile.Profile() if "cpu" in modes else None
+    if "mem" in modes:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        logger = get_logger()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        if profiler:
+            profiler.disable()
+            prof_path = LOG_PATH.parent / f"{run_name}-{stamp}.prof"
+            profiler.dump_stats(prof_path)
+            # The human-readable top functions go next to the dump, keeping etl.log one line per record
+            stats_path = prof_path.with_suffix(".txt")
+            with open(stats_path, "w", encoding="utf-8") as out:
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(15)
+            logger.info(format_fields({"stage": "profile", "run": run_name, "kind": "cpu", "file": prof_path, "stats": stats_path}))
+        if "mem" in modes:
+            _, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:10]
+            tracemalloc.stop()
+            logger.info(format_fields({"stage": "profile", "run": run_name, "kind": "mem", "peak_mb": peak / (1024 * 1024)}))
+            for stat in top:
+                frame = stat.traceback[0]
+                logger.info(format_fields({"stage": "profile", "run": run_name, "kind": "mem", "site": f"{frame.filename}:{frame.lineno}", "size_kb": stat.size / 1024, "count": stat.count}))
@@ -1,14 +1,38 @@
 import xml.etree.ElementTree as ET
+import argparse
+import glob
+import gzip
 import json
 import re
 import os
+import queue
+import time
+import zipfile
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+from contextlib import contextmanager
 from datetime import datetime
 
+from etl.metrics import Metrics, log_stage, profiled
+
 # Paths
 XML_PATH = os.path.join("data", "raw", "momo.xml")
 OUTPUT_PATH = os.path.join("data", "processed", "formatted_data.json")
 
+# Backup formats accepted as input, streamed without temp files
+INPUT_SUFFIXES = (".xml", ".xml.gz", ".zip", ".xml.zst")
+
+# Messages per chunk sent from a worker process, and chunks a worker may get
+# ahead of the parent before it blocks
+CHUNK_SIZE = 2000
+MAX_PENDING_CHUNKS = 4
+
+SELF_NUMBER = 36521838
+
+# Per-type message counts, parse time and regex misses of the current run
+metrics = Metrics()
+
 # Helper functions for ID generation
 def make_id(prefix, idx):
     return f"{prefix}{idx:05d}"
@@ -18,11 +42,25 @@ def parse_amount(text):
     match = re.search(r"([\d,]+(?:\.\d+)?)", text.replace(",", ""))
     return float(match.group(1)) if match else 0.0
 
+def parse_tx_amount(pattern, body):
+    # Amount captured by a message-specific pattern, so IDs and USSD codes
+    # before it (e.g. "TxId: 7321...", "*165*S*") aren't taken as the amount.
+    # None when the pattern misses; the first number in the body is no safer.
+    match = re.search(pattern, body, re.I)
+    return parse_amount(match.group(1)) if match else None
+
 def parse_phone(text):
     # Extracts a phone number from a string
     match = re.search(r"(\d{9,12})", text)
     return match.group(1) if match else None
 
+def parse_date_ms(ts):
+    # Raw "date" attribute (ms since the epoch), to order messages within a second
+    try:
+        return int(ts)
+    except (TypeError, ValueError):
+        return None
+
 def parse_date(ts):
     # Converts timestamp (ms) to ISO format
     try:
@@ -33,307 +71,452 @@ def parse_date(ts):
 def clean_name(name):
     return name.strip().title() if name else None
 
-# Data containers
-data = {
-    "Customer": [],
-    "Agent": [],
-    "Deposit": [],
-    "Withdrawal": [],
-    "Sender_Log": [],
-    "Receiver_Log": [],
-    "Transfer": [],
-    "Payment": []
-}
-
-# Indexes for deduplication
-customer_map = {}
-agent_map = {}
-sender_log_map = {}
-receiver_log_map = {}
-
-customer_idx = 1
-agent_idx = 1
-sender_log_idx = 1
-receiver_log_idx = 1
-deposit_idx = 1
-withdraw_idx = 1
-transfer_idx = 1
-payment_idx = 1
-
-# Parse XML
-context = ET.iterparse(XML_PATH, events=("end",))
-for event, elem in context:
-    if elem.tag != "sms":
-        continue
-    attrib = elem.attrib
+def parse_tx_id(text):
+    # Extracts the provider transaction ID ("TxId" or "Financial Transaction Id")
+    match = re.search(r"(?:TxId|Financial Transaction Id):\s*(\d+)", text)
+    return match.group(1) if match else None
+
+def count_misses(stats, sms_type, **fields):
+    # Counts the fields a regex failed to extract from a message
+    for field, value in fields.items():
+        if value is None:
+            stats.incr("regex_miss", type=sms_type, field=field)
+
+def extract_message(attrib, stats):
+    # Classifies one <sms> and extracts its fields. Only looks at the message
+    # itself, so it can run in worker processes; IDs are assigned afterwards.
     body = attrib.get("body", "")
-    readable_date = attrib.get("readable_date", "")
-    date = attrib.get("date", "")
-    date_sent = attrib.get("date_sent", "")
+    record = {
+        "type": "Other",
+        "time_stamp": parse_date(attrib.get("date", "")),
+        "date_ms": parse_date_ms(attrib.get("date")),
+        "readable_date": attrib.get("readable_date", ""),
+        "tx_id": parse_tx_id(body)
+    }
+    new_balance = parse_amount(re.search(r"new balance[: ]*([\d,]+)", body, re.I).group(1)) if re.search(r"new balance[: ]*([\d,]+)", body, re.I) else None
     # Transaction type detection
     # Deposit
     if re.search(r"deposit of", body, re.I):
         # Example: "A bank deposit of 40000 RWF has been added..."
-        amount = parse_amount(body)
-        new_balance = parse_amount(re.search(r"new balance[: ]*([\d,]+)", body, re.I).group(1)) if re.search(r"new balance[: ]*([\d,]+)", body, re.I) else None
-        customer_name = None
-        customer_number = None
-        # Try to extract customer from context (not always present)
-        cust_key = "self"
-        if cust_key not in customer_map:
-            customer_id = make_id("C", customer_idx)
-            customer_map[cust_key] = customer_id
-            data["Customer"].append({
-                "customer_id": customer_id,
-                "customer_name": "Self",
-                "customer_number": 36521838  # fallback or dummy
-            })
-            customer_idx += 1
-        deposit_id = make_id("D", deposit_idx)
-        data["Deposit"].append({
-            "deposit_id": deposit_id,
-            "customer_id": customer_map[cust_key],
-            "amount": amount,
-            "time_stamp": parse_date(date),
-            "readable_date": readable_date,
-            "new_balance": new_balance
-        })
-        deposit_idx += 1
+        record["type"] = "Deposit"
+        record["amount"] = parse_tx_amount(r"deposit of ([\d,]+) RWF", body)
+        record["new_balance"] = new_balance
+        count_misses(stats, "Deposit", amount=record["amount"], new_balance=new_balance)
     # Withdrawal
     elif re.search(r"withdrawn|withdrawal", body, re.I):
         # Example: "withdrawn 20000 RWF from your mobile money account... via agent: Agent Sophia (250790777777)"
-        amount = parse_amount(body)
-        fee = parse_amount(re.search(r"Fee paid: ([\d,]+)", body, re.I).group(1)) if re.search(r"Fee paid: ([\d,]+)", body, re.I) else None
-        new_balance = parse_amount(re.search(r"new balance[: ]*([\d,]+)", body, re.I).group(1)) if re.search(r"new balance[: ]*([\d,]+)", body, re.I) else None
+        record["type"] = "Withdrawal"
+        record["amount"] = parse_tx_amount(r"withdrawn ([\d,]+) RWF", body)
+        record["fee"] = parse_amount(re.search(r"Fee paid: ([\d,]+)", body, re.I).group(1)) if re.search(r"Fee paid: ([\d,]+)", body, re.I) else None
+        record["new_balance"] = new_balance
         agent_match = re.search(r"agent: ([\w ]+) \((\d+)\)", body)
-        agent_name = clean_name(agent_match.group(1)) if agent_match else None
-        agent_number = agent_match.group(2) if agent_match else None
-        if agent_number and agent_number not in agent_map:
-            agent_id = make_id("A", agent_idx)
-            agent_map[agent_number] = agent_id
-            data["Agent"].append({
-                "agent_id": agent_id,
-                "agent_name": agent_name or "Unknown",
-                "agent_number": int(agent_number)
-            })
-            agent_idx += 1
-        cust_key = "self"
-        if cust_key not in customer_map:
-            customer_id = make_id("C", customer_idx)
-            customer_map[cust_key] = customer_id
-            data["Customer"].append({
-                "customer_id": customer_id,
-                "customer_name": "Self",
-                "customer_number": 36521838
-            })
-            customer_idx += 1
-        withdraw_id = make_id("W", withdraw_idx)
-        data["Withdrawal"].append({
-            "withdraw_id": withdraw_id,
-            "agent_id": agent_map.get(agent_number),
-            "customer_id": customer_map[cust_key],
-            "amount": amount,
-            "fee": fee,
-            "new_balance": new_balance,
-            "time_stamp": parse_date(date),
-            "readable_date": readable_date
-        })
-        withdraw_idx += 1
+        record["agent_name"] = clean_name(agent_match.group(1)) if agent_match else None
+        record["agent_number"] = agent_match.group(2) if agent_match else None
+        count_misses(stats, "Withdrawal", amount=record["amount"], fee=record["fee"], new_balance=new_balance, agent=agent_match)
     # Transfer (Send/Receive)
-    elif re.search(r"transferred to|received from", body, re.I):
+    elif re.search(r"transferred to|received [\d,]+ RWF from", body, re.I):
         # Send: "10000 RWF transferred to Samuel Carter (250791666666) from 36521838..."
         # Receive: "You have received 2000 RWF from Jane Smith (*********013)..."
         if "transferred to" in body:
             # Send
-            amount = parse_amount(body)
-            fee = parse_amount(re.search(r"Fee was: ([\d,]+)", body, re.I).group(1)) if re.search(r"Fee was: ([\d,]+)", body, re.I) else None
-            new_balance = parse_amount(re.search(r"New balance: ([\d,]+)", body, re.I).group(1)) if re.search(r"New balance: ([\d,]+)", body, re.I) else None
+            record["type"] = "Transfer_Send"
+            record["amount"] = parse_tx_amount(r"([\d,]+) RWF transferred to", body)
+            record["fee"] = parse_amount(re.search(r"Fee was: ([\d,]+)", body, re.I).group(1)) if re.search(r"Fee was: ([\d,]+)", body, re.I) else None
+            record["new_balance"] = parse_amount(re.search(r"New balance: ([\d,]+)", body, re.I).group(1)) if re.search(r"New balance: ([\d,]+)", body, re.I) else None
             recipient_match = re.search(r"transferred to ([\w ]+) \((\d+)\)", body)
-            recipient_name = clean_name(recipient_match.group(1)) if recipient_match else None
-            recipient_number = recipient_match.group(2) if recipient_match else None
-            # Sender (self)
-            cust_key = "self"
-            if cust_key not in customer_map:
-                customer_id = make_id("C", customer_idx)
-                customer_map[cust_key] = customer_id
-                data["Customer"].append({
-                    "customer_id": customer_id,
-                    "customer_name": "Self",
-                    "customer_number": 36521838
-                })
-                customer_idx += 1
-            # Receiver
-            if recipient_number and recipient_number not in customer_map:
-                customer_id = make_id("C", customer_idx)
-                customer_map[recipient_number] = customer_id
-                data["Customer"].append({
-                    "customer_id": customer_id,
-                    "customer_name": recipient_name or "Unknown",
-                    "customer_number": int(recipient_number)
-                })
-                customer_idx += 1
-            # Sender Log
-            if cust_key not in sender_log_map:
-                sender_log_id = make_id("SL", sender_log_idx)
-                sender_log_map[cust_key] = sender_log_id
-                data["Sender_Log"].append({
-                    "sender_log_id": sender_log_id,
-                    "customer_id": customer_map[cust_key],
-                    "transaction_type": "Transfer"
-                })
-                sender_log_idx += 1
-            # Receiver Log
-            if recipient_number and recipient_number not in receiver_log_map:
-                receiver_log_id = make_id("RL", receiver_log_idx)
-                receiver_log_map[recipient_number] = receiver_log_id
-                data["Receiver_Log"].append({
-                    "receiver_log_id": receiver_log_id,
-                    "customer_id": customer_map[recipient_number],
-                    "transaction_type": "Transfer"
-                })
-                receiver_log_idx += 1
-            transfer_id = make_id("T", transfer_idx)
-            data["Transfer"].append({
-                "transfer_id": transfer_id,
-                "receiver_log_id": receiver_log_map.get(recipient_number),
-                "sender_log_id": sender_log_map.get(cust_key),
-                "amount": amount,
-                "fee": fee,
-                "recipient_name": recipient_name,
-                "recipient_number": int(recipient_number) if recipient_number else None,
-                "new_balance": new_balance,
-                "transfer_type": "Send"
-            })
-            transfer_idx += 1
-        elif "received from" in body:
+            record["recipient_name"] = clean_name(recipient_match.group(1)) if recipient_match else None
+            record["recipient_number"] = recipient_match.group(2) if recipient_match else None
+            count_misses(stats, "Transfer_Send", amount=record["amount"], fee=record["fee"], new_balance=record["new_balance"], recipient=recipient_match)
+        elif re.search(r"received [\d,]+ RWF from", body):
             # Receive
-            amount = parse_amount(body)
-            new_balance = parse_amount(re.search(r"new balance[: ]*([\d,]+)", body, re.I).group(1)) if re.search(r"new balance[: ]*([\d,]+)", body, re.I) else None
+            record["type"] = "Transfer_Receive"
+            record["amount"] = parse_tx_amount(r"received ([\d,]+) RWF", body)
+            record["new_balance"] = new_balance
             sender_match = re.search(r"received ([\d,]+) RWF from ([\w ]+) \((\*+\d+)\)", body)
-            sender_name = clean_name(sender_match.group(2)) if sender_match else None
-            sender_number = sender_match.group(3) if sender_match else None
-            # Receiver (self)
-            cust_key = "self"
-            if cust_key not in customer_map:
-                customer_id = make_id("C", customer_idx)
-                customer_map[cust_key] = customer_id
-                data["Customer"].append({
-                    "customer_id": customer_id,
-                    "customer_name": "Self",
-                    "customer_number": 36521838
-                })
-                customer_idx += 1
-            # Sender
-            if sender_number and sender_number not in customer_map:
-                customer_id = make_id("C", customer_idx)
-                customer_map[sender_number] = customer_id
-                data["Customer"].append({
-                    "customer_id": customer_id,
-                    "customer_name": sender_name or "Unknown",
-                    "customer_number": None
-                })
-                customer_idx += 1
-            # Sender Log
-            if sender_number and sender_number not in sender_log_map:
-                sender_log_id = make_id("SL", sender_log_idx)
-                sender_log_map[sender_number] = sender_log_id
-                data["Sender_Log"].append({
-                    "sender_log_id": sender_log_id,
-                    "customer_id": customer_map[sender_number],
-                    "transaction_type": "Transfer"
-                })
-                sender_log_idx += 1
-            # Receiver Log
-            if cust_key not in receiver_log_map:
-                receiver_log_id = make_id("RL", receiver_log_idx)
-                receiver_log_map[cust_key] = receiver_log_id
-                data["Receiver_Log"].append({
-                    "receiver_log_id": receiver_log_id,
-                    "customer_id": customer_map[cust_key],
-                    "transaction_type": "Transfer"
-                })
-                receiver_log_idx += 1
-            transfer_id = make_id("T", transfer_idx)
-            data["Transfer"].append({
-                "transfer_id": transfer_id,
-                "receiver_log_id": receiver_log_map.get(cust_key),
-                "sender_log_id": sender_log_map.get(sender_number),
-                "amount": amount,
-                "fee": None,
-                "recipient_name": "Self",
-                "recipient_number": 36521838,
-                "new_balance": new_balance,
-                "transfer_type": "Receive"
-            })
-            transfer_idx += 1
+            record["sender_name"] = clean_name(sender_match.group(2)) if sender_match else None
+            record["sender_number"] = sender_match.group(3) if sender_match else None
+            count_misses(stats, "Transfer_Receive", amount=record["amount"], new_balance=new_balance, sender=sender_match)
     # Payment
     elif re.search(r"Your payment of", body, re.I):
         # Example: "Your payment of 1,000 RWF to Jane Smith 12845 has been completed..."
-        amount = parse_amount(body)
-        fee = parse_amount(re.search(r"Fee was ([\d,]+)", body, re.I).group(1)) if re.search(r"Fee was ([\d,]+)", body, re.I) else None
-        new_balance = parse_amount(re.search(r"new balance[: ]*([\d,]+)", body, re.I).group(1)) if re.search(r"new balance[: ]*([\d,]+)", body, re.I) else None
+        record["type"] = "Payment"
+        record["amount"] = parse_tx_amount(r"payment of ([\d,]+) RWF", body)
+        record["fee"] = parse_amount(re.search(r"Fee was ([\d,]+)", body, re.I).group(1)) if re.search(r"Fee was ([\d,]+)", body, re.I) else None
+        record["new_balance"] = new_balance
         receiver_match = re.search(r"to ([\w ]+) (\d{3,})", body)
-        receiver_name = clean_name(receiver_match.group(1)) if receiver_match else None
-        receiver_number = receiver_match.group(2) if receiver_match else None
-        # Sender (self)
-        cust_key = "self"
-        if cust_key not in customer_map:
-            customer_id = make_id("C", customer_idx)
-            customer_map[cust_key] = customer_id
-            data["Customer"].append({
+        record["receiver_name"] = clean_name(receiver_match.group(1)) if receiver_match else None
+        record["receiver_number"] = receiver_match.group(2) if receiver_match else None
+        count_misses(stats, "Payment", amount=record["amount"], fee=record["fee"], new_balance=new_balance, receiver=receiver_match)
+    return record
+
+
+class FormattedData:
+    # Turns extracted records into the normalized tables, assigning IDs and
+    # deduplicating customers, agents and sender/receiver logs in input order
+
+    def __init__(self):
+        # Data containers
+        self.data = {
+            "Customer": [],
+            "Agent": [],
+            "Deposit": [],
+            "Withdrawal": [],
+            "Sender_Log": [],
+            "Receiver_Log": [],
+            "Transfer": [],
+            "Payment": []
+        }
+        # Indexes for deduplication
+        self.customer_map = {}
+        self.agent_map = {}
+        self.sender_log_map = {}
+        self.receiver_log_map = {}
+
+    def next_id(self, table, prefix):
+        return make_id(prefix, len(self.data[table]) + 1)
+
+    def customer(self, key, name, number):
+        if key not in self.customer_map:
+            customer_id = self.next_id("Customer", "C")
+            self.customer_map[key] = customer_id
+            self.data["Customer"].append({
                 "customer_id": customer_id,
-                "customer_name": "Self",
-                "customer_number": 36521838
+                "customer_name": name,
+                "customer_number": number
             })
-            customer_idx += 1
-        # Receiver
-        if receiver_number and receiver_number not in customer_map:
-            customer_id = make_id("C", customer_idx)
-            customer_map[receiver_number] = customer_id
-            data["Customer"].append({
-                "customer_id": customer_id,
-                "customer_name": receiver_name or "Unknown",
-                "customer_number": int(receiver_number)
+        return self.customer_map[key]
+
+    def agent(self, number, name):
+        if number not in self.agent_map:
+            agent_id = self.next_id("Agent", "A")
+            self.agent_map[number] = agent_id
+            self.data["Agent"].append({
+                "agent_id": agent_id,
+                "agent_name": name or "Unknown",
+                "agent_number": int(number)
+            })
+        return self.agent_map[number]
+
+    def sender_log(self, key, transaction_type):
+        if key not in self.sender_log_map:
+            sender_log_id = self.next_id("Sender_Log", "SL")
+            self.sender_log_map[key] = sender_log_id
+            self.data["Sender_Log"].append({
+                "sender_log_id": sender_log_id,
+                "customer_id": self.customer_map[key],
+                "transaction_type": transaction_type
+            })
+        return self.sender_log_map[key]
+
+    def receiver_log(self, key, transaction_type):
+        if key not in self.receiver_log_map:
+            receiver_log_id = self.next_id("Receiver_Log", "RL")
+            self.receiver_log_map[key] = receiver_log_id
+            self.data["Receiver_Log"].append({
+                "receiver_log_id": receiver_log_id,
+                "customer_id": self.customer_map[key],
+                "transaction_type": transaction_type
+            })
+        return self.receiver_log_map[key]
+
+    def add(self, record):
+        sms_type = record["type"]
+        if sms_type == "Deposit":
+            self.data["Deposit"].append({
+                "deposit_id": self.next_id("Deposit", "D"),
+                "customer_id": self.customer("self", "Self", SELF_NUMBER),
+                "amount": record["amount"],
+                "time_stamp": record["time_stamp"],
+                "date_ms": record["date_ms"],
+                "readable_date": record["readable_date"],
+                "new_balance": record["new_balance"],
+                "tx_id": record["tx_id"]
             })
-            customer_idx += 1
-        # Sender Log
-        if cust_key not in sender_log_map:
-            sender_log_id = make_id("SL", sender_log_idx)
-            sender_log_map[cust_key] = sender_log_id
-            data["Sender_Log"].append({
+        elif sms_type == "Withdrawal":
+            agent_number = record["agent_number"]
+            if agent_number:
+                self.agent(agent_number, record["agent_name"])
+            self.data["Withdrawal"].append({
+                "withdraw_id": self.next_id("Withdrawal", "W"),
+                "agent_id": self.agent_map.get(agent_number),
+                "customer_id": self.customer("self", "Self", SELF_NUMBER),
+                "amount": record["amount"],
+                "fee": record["fee"],
+                "new_balance": record["new_balance"],
+                "time_stamp": record["time_stamp"],
+                "date_ms": record["date_ms"],
+                "readable_date": record["readable_date"],
+                "tx_id": record["tx_id"]
+            })
+        elif sms_type == "Transfer_Send":
+            recipient_number = record["recipient_number"]
+            # Sender (self) and receiver
+            self.customer("self", "Self", SELF_NUMBER)
+            if recipient_number:
+                self.customer(recipient_number, record["recipient_name"] or "Unknown", int(recipient_number))
+            sender_log_id = self.sender_log("self", "Transfer")
+            if recipient_number:
+                self.receiver_log(recipient_number, "Transfer")
+            self.data["Transfer"].append({
+                "transfer_id": self.next_id("Transfer", "T"),
+                "receiver_log_id": self.receiver_log_map.get(recipient_number),
                 "sender_log_id": sender_log_id,
-                "customer_id": customer_map[cust_key],
-                "transaction_type": "Payment"
+                "amount": record["amount"],
+                "fee": record["fee"],
+                "recipient_name": record["recipient_name"],
+                "recipient_number": int(recipient_number) if recipient_number else None,
+                "new_balance": record["new_balance"],
+                "transfer_type": "Send",
+                "time_stamp": record["time_stamp"],
+                "date_ms": record["date_ms"],
+                "readable_date": record["readable_date"],
+                "tx_id": record["tx_id"]
             })
-            sender_log_idx += 1
-        # Receiver Log
-        if receiver_number and receiver_number not in receiver_log_map:
-            receiver_log_id = make_id("RL", receiver_log_idx)
-            receiver_log_map[receiver_number] = receiver_log_id
-            data["Receiver_Log"].append({
+        elif sms_type == "Transfer_Receive":
+            sender_number = record["sender_number"]
+            # Receiver (self) and sender
+            self.customer("self", "Self", SELF_NUMBER)
+            if sender_number:
+                self.customer(sender_number, record["sender_name"] or "Unknown", None)
+                self.sender_log(sender_number, "Transfer")
+            receiver_log_id = self.receiver_log("self", "Transfer")
+            self.data["Transfer"].append({
+                "transfer_id": self.next_id("Transfer", "T"),
                 "receiver_log_id": receiver_log_id,
-                "customer_id": customer_map[receiver_number],
-                "transaction_type": "Payment"
+                "sender_log_id": self.sender_log_map.get(sender_number),
+                "amount": record["amount"],
+                "fee": None,
+                "recipient_name": "Self",
+                "recipient_number": SELF_NUMBER,
+                "new_balance": record["new_balance"],
+                "transfer_type": "Receive",
+                "time_stamp": record["time_stamp"],
+                "date_ms": record["date_ms"],
+                "readable_date": record["readable_date"],
+                "tx_id": record["tx_id"]
+            })
+        elif sms_type == "Payment":
+            receiver_number = record["receiver_number"]
+            # Sender (self) and receiver
+            self.customer("self", "Self", SELF_NUMBER)
+            if receiver_number:
+                self.customer(receiver_number, record["receiver_name"] or "Unknown", int(receiver_number))
+            sender_log_id = self.sender_log("self", "Payment")
+            if receiver_number:
+                self.receiver_log(receiver_number, "Payment")
+            self.data["Payment"].append({
+                "payment_id": self.next_id("Payment", "P"),
+                "receiver_log_id": self.receiver_log_map.get(receiver_number),
+                "sender_log_id": sender_log_id,
+                "amount": record["amount"],
+                "fee": record["fee"],
+                "new_balance": record["new_balance"],
+                "time_stamp": record["time_stamp"],
+                "date_ms": record["date_ms"],
+                "readable_date": record["readable_date"],
+                "payment_type": None,
+                "tx_id": record["tx_id"]
             })
-            receiver_log_idx += 1
-        payment_id = make_id("P", payment_idx)
-        data["Payment"].append({
-            "payment_id": payment_id,
-            "receiver_log_id": receiver_log_map.get(receiver_number),
-            "sender_log_id": sender_log_map.get(cust_key),
-            "amount": amount,
-            "fee": fee,
-            "new_balance": new_balance,
-            "time_stamp": parse_date(date),
-            "readable_date": readable_date,
-            "payment_type": None
-        })
-        payment_idx += 1
-    # Clean up
-    elem.clear()
-
-# Write output
-with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
-    json.dump(data, f, indent=2, ensure_ascii=False)
-
-print(f"Formatted data written to {OUTPUT_PATH}")
\ No newline at end of file
+
+
+def expand_inputs(patterns):
+    # Files, directories (searched recursively) and glob patterns -> (path, zip member) sources
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for dirpath, _, filenames in os.walk(pattern):
+                paths.extend(os.path.join(dirpath, name) for name in filenames if name.lower().endswith(INPUT_SUFFIXES))
+        else:
+            matches = glob.glob(pattern, recursive=True)
+            # A glob like data/raw/* may also match READMEs, checksums, ... which are skipped
+            usable = [path for path in matches if os.path.isfile(path) and path.lower().endswith(INPUT_SUFFIXES)]
+            if not usable:
+                if matches and not glob.has_magic(pattern):
+                    raise ValueError(f"Unsupported input file {pattern}, expected one of {', '.join(INPUT_SUFFIXES)}")
+                raise FileNotFoundError(f"No {', '.join(INPUT_SUFFIXES)} input files match {pattern}")
+            paths.extend(usable)
+
+    sources = []
+    for path in sorted(set(paths)):
+        if path.lower().endswith(".zip"):
+            with zipfile.ZipFile(path) as zf:
+                sources.extend((path, name) for name in zf.namelist() if name.lower().endswith(".xml"))
+        else:
+            sources.append((path, None))
+    if not sources:
+        raise FileNotFoundError(f"No input messages found in {', '.join(patterns)}")
+    return sources
+
+
+@contextmanager
+def open_source(path, member=None):
+    # Binary stream of the XML, decompressed on the fly
+    name = path.lower()
+    if member is not None:
+        with zipfile.ZipFile(path) as zf, zf.open(member) as f:
+            yield f
+    elif name.endswith(".gz"):
+        with gzip.open(path, "rb") as f:
+            yield f
+    elif name.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError(f"Reading {path} requires the zstandard package (pip install zstandard)") from e
+        with open(path, "rb") as raw, zstandard.ZstdDecompressor().stream_reader(raw) as f:
+            yield f
+    else:
+        with open(path, "rb") as f:
+            yield f
+
+
+def iter_messages(source, stats):
+    # Extracted messages of one input, one at a time. Per-type counts and
+    # parse time are kept in plain dicts and added to stats once per input,
+    # which keeps the lock and label sorting of Metrics.incr off the hot path.
+    path, member = source
+    counts = defaultdict(int)
+    seconds = defaultdict(float)
+    perf_counter = time.perf_counter
+    try:
+        with open_source(path, member) as f:
+            context = ET.iterparse(f, events=("start", "end"))
+            _, root = next(context)
+            for event, elem in context:
+                if event != "end" or elem.tag != "sms":
+                    continue
+                start = perf_counter()
+                record = extract_message(elem.attrib, stats)
+                sms_type = record["type"]
+                counts[sms_type] += 1
+                seconds[sms_type] += perf_counter() - start
+                # Clean up, detaching parsed messages from the root too
+                root.clear()
+                yield record
+    finally:
+        for sms_type, count in counts.items():
+            stats.incr("messages", count, type=sms_type)
+            stats.incr("parse_seconds", seconds[sms_type], type=sms_type)
+
+
+def parse_source(source, chunks):
+    # Runs in a worker process: sends the messages of one input to the parent in
+    # chunks, blocking while the parent is MAX_PENDING_CHUNKS behind
+    stats = Metrics()
+    chunk = []
+    try:
+        for record in iter_messages(source, stats):
+            chunk.append(record)
+            if len(chunk) == CHUNK_SIZE:
+                chunks.put(chunk)
+                chunk = []
+        if chunk:
+            chunks.put(chunk)
+    finally:
+        chunks.put(None)
+    return stats.export_counters()
+
+
+def iter_chunks(chunks, future):
+    # Chunks of one worker until its end marker; a worker that died without
+    # sending one raises through future.result()
+    while True:
+        try:
+            chunk = chunks.get(timeout=1)
+        except queue.Empty:
+            if not future.done():
+                continue
+            # The worker may have queued its last chunks and the end marker
+            # after the timeout; everything it put is there now
+            while True:
+                try:
+                    chunk = chunks.get_nowait()
+                except queue.Empty:
+                    future.result()
+                    raise RuntimeError("Parser worker exited without sending all of its messages")
+                if chunk is None:
+                    return
+                yield chunk
+        if chunk is None:
+            return
+        yield chunk
+
+
+def parse_files(sources, workers=1):
+    # Extraction runs concurrently per input; IDs are then assigned in input order.
+    # Messages are streamed into FormattedData, so only the output tables and a
+    # bounded number of in-flight chunks are held in memory.
+    formatted = FormattedData()
+
+    def finish(source, messages, counters):
+        path, member = source
+        metrics.merge_counters(counters)
+        log_stage("parse", file=f"{path}:{member}" if member else path, messages=messages)
+
+    if workers <= 1 or len(sources) <= 1:
+        for source in sources:
+            stats = Metrics()
+            messages = 0
+            for record in iter_messages(source, stats):
+                formatted.add(record)
+                messages += 1
+            finish(source, messages, stats.export_counters())
+        return formatted.data
+
+    # One bounded queue per input, drained in input order. Inputs start in
+    # submission order, so the one being drained always has a worker.
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(sources)))
+    manager = Manager()
+    try:
+        queues = [manager.Queue(MAX_PENDING_CHUNKS) for _ in sources]
+        futures = [executor.submit(parse_source, source, chunks) for source, chunks in zip(sources, queues)]
+        for source, chunks, future in zip(sources, queues, futures):
+            messages = 0
+            for chunk in iter_chunks(chunks, future):
+                for record in chunk:
+                    formatted.add(record)
+                messages += len(chunk)
+            finish(source, messages, future.result())
+    finally:
+        # Stopping the manager first unblocks workers still waiting to put a chunk
+        manager.shutdown()
+        executor.shutdown(cancel_futures=True)
+    return formatted.data
+
+def parse_file(xml_path):
+    return parse_files([(xml_path, None)])
+
+def log_metrics(label, elapsed):
+    # One structured etl.log line per SMS type, per regex miss and for the whole run
+    seconds_by_type = {labels["type"]: seconds for labels, seconds in metrics.counter_values("parse_seconds")}
+    total = 0
+    for labels, count in metrics.counter_values("messages"):
+        seconds = seconds_by_type.get(labels["type"], 0.0)
+        log_stage("parse", type=labels["type"], messages=count, seconds=seconds, messages_per_sec=round(count / seconds) if seconds else 0)
+        total += count
+    for labels, count in metrics.counter_values("regex_miss"):
+        log_stage("parse", type=labels["type"], regex_miss=labels["field"], count=count)
+    log_stage("parse", inputs=label, messages=total, seconds=elapsed, messages_per_sec=round(total / elapsed) if elapsed else 0)
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse MoMo SMS backups into formatted JSON.")
+    parser.add_argument("inputs", nargs="*", default=[XML_PATH], help=f"files, directories or glob patterns of {', '.join(INPUT_SUFFIXES)} backups")
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="inputs parsed concurrently")
+    args = parser.parse_args()
+
+    with profiled("parse_xml"):
+        sources = expand_inputs(args.inputs)
+        start = time.perf_counter()
+        data = parse_files(sources, args.workers)
+        log_metrics(len(sources), time.perf_counter() - start)
+
+        # Write output
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+    print(f"Formatted data from {len(sources)} input(s) written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
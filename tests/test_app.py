@@ -0,0 +1,56 @@
+import threading
+from http.server import HTTPServer
+from urllib.error import URLError
+from urllib.request import urlopen
+
+import pytest
+
+from api import app
+from etl.metrics import Metrics
+
+
+@pytest.mark.parametrize("path, route", [
+    ("/transactions", "/transactions"),
+    ("/transactions/D00001", "/transactions/<id>"),
+    ("/transactions/P00042?x=1", "/transactions/<id>"),
+    ("/search?q=jane", "/search"),
+    ("/balance-history?from=2024-05-10", "/balance-history"),
+    ("/metrics", "/metrics"),
+    ("/favicon.ico", "other")
+])
+def test_route_of_collapses_ids(path, route):
+    assert app.route_of(path) == route
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(app, "metrics", Metrics())
+    monkeypatch.setattr(app.RequestHandler, "authenticate", lambda self: True)
+    monkeypatch.setattr(app.RequestHandler, "log_message", lambda self, format, *args: None)
+    server = HTTPServer(("127.0.0.1", 0), app.RequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_failing_handler_counted_as_500(server, monkeypatch):
+    def fail():
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(app, "fetch_all_transactions", fail)
+    # Keep the expected traceback out of the test output
+    monkeypatch.setattr(HTTPServer, "handle_error", lambda self, request, client_address: None)
+    with pytest.raises((URLError, ConnectionError)):
+        urlopen(server + "/transactions", timeout=5)
+
+    assert app.metrics.counter_values("requests") == [({"method": "GET", "route": "/transactions", "status": 500}, 1)]
+    latency = app.metrics.snapshot()["histograms"]["request_latency{method=GET,route=/transactions}"]
+    assert latency["count"] == 1
+
+
+def test_handled_request_counted_with_its_status(server):
+    with urlopen(server + "/metrics", timeout=5) as response:
+        assert response.status == 200
+    assert app.metrics.counter_values("requests") == [({"method": "GET", "route": "/metrics", "status": 200}, 1)]
@@ -0,0 +1,178 @@
+import json
+import os
+
+import pytest
+
+from api import ledger as api_ledger
+from api.ledger import balance_history, parse_bound
+from etl.build_ledger import build_ledger
+
+
+def empty_data():
+    return {
+        "Customer": [{"customer_id": "C00001", "customer_name": "Self", "customer_number": 36521838}],
+        "Agent": [],
+        "Deposit": [],
+        "Withdrawal": [],
+        "Sender_Log": [{"sender_log_id": "SL00001", "customer_id": "C00001", "transaction_type": "Transfer"}],
+        "Receiver_Log": [],
+        "Transfer": [],
+        "Payment": []
+    }
+
+
+def deposit(n, amount, new_balance, time_stamp, date_ms=None):
+    return {"deposit_id": f"D{n:05d}", "customer_id": "C00001", "amount": amount, "new_balance": new_balance,
+            "time_stamp": time_stamp, "date_ms": date_ms, "tx_id": None}
+
+
+def withdrawal(n, amount, fee, new_balance, time_stamp, date_ms=None):
+    return {"withdraw_id": f"W{n:05d}", "agent_id": None, "customer_id": "C00001", "amount": amount, "fee": fee,
+            "new_balance": new_balance, "time_stamp": time_stamp, "date_ms": date_ms, "tx_id": None}
+
+
+def send(n, amount, fee, new_balance, time_stamp, date_ms=None):
+    return {"transfer_id": f"T{n:05d}", "receiver_log_id": None, "sender_log_id": "SL00001", "amount": amount,
+            "fee": fee, "new_balance": new_balance, "transfer_type": "Send", "time_stamp": time_stamp,
+            "date_ms": date_ms, "tx_id": None}
+
+
+def rows(ledger, account="C00001"):
+    columns = ledger["accounts"][account]
+    return [{name: values[i] for name, values in columns.items()} for i in range(len(columns["time_stamp"]))]
+
+
+def test_expected_balance_and_gaps():
+    data = empty_data()
+    data["Deposit"] = [
+        deposit(1, 1000.0, 1000.0, "2024-05-10 10:00:00"),
+        # 300 RWF more than expected: a message is missing
+        deposit(2, 500.0, 1800.0, "2024-05-10 12:00:00")
+    ]
+    data["Withdrawal"] = [withdrawal(1, 200.0, 50.0, 750.0, "2024-05-10 11:00:00")]
+
+    ledger = build_ledger(data)
+    first, wd, second = rows(ledger)
+    assert first["expected_balance"] is None and not first["gap"]
+    assert wd["delta"] == -250.0 and wd["expected_balance"] == 750.0
+    assert not wd["gap"] and not wd["fee_anomaly"]
+    assert second["expected_balance"] == 1250.0 and second["difference"] == 550.0 and second["gap"]
+    assert ledger["summary"]["C00001"]["gaps"] == 1
+    assert ledger["summary"]["C00001"]["closing_balance"] == 1800.0
+
+
+def test_fee_anomalies():
+    data = empty_data()
+    data["Deposit"] = [deposit(1, 1000.0, 1000.0, "2024-05-10 10:00:00")]
+    data["Withdrawal"] = [withdrawal(1, 100.0, None, 900.0, "2024-05-10 11:00:00")]
+    # Balance only reconciles with the 20 RWF fee left out
+    data["Transfer"] = [send(1, 100.0, 20.0, 800.0, "2024-05-10 12:00:00")]
+
+    _, wd, tr = rows(build_ledger(data))
+    assert wd["fee_anomaly"] and not wd["gap"]
+    assert tr["gap"] and tr["difference"] == 20.0 and tr["fee_anomaly"]
+
+
+def test_unparsed_amount_resyncs_on_reported_balance():
+    data = empty_data()
+    data["Deposit"] = [
+        deposit(1, 1000.0, 1000.0, "2024-05-10 10:00:00"),
+        deposit(2, None, 1500.0, "2024-05-10 11:00:00"),
+        deposit(3, 100.0, 1600.0, "2024-05-10 12:00:00")
+    ]
+
+    _, unknown, after = rows(build_ledger(data))
+    assert unknown["delta"] is None and unknown["expected_balance"] is None and not unknown["gap"]
+    assert after["expected_balance"] == 1600.0 and not after["gap"]
+
+
+def test_unknown_amount_and_balance_breaks_the_chain():
+    data = empty_data()
+    data["Deposit"] = [
+        deposit(1, 1000.0, 1000.0, "2024-05-10 10:00:00"),
+        deposit(2, None, None, "2024-05-10 11:00:00"),
+        deposit(3, 100.0, 1600.0, "2024-05-10 12:00:00")
+    ]
+
+    ledger = build_ledger(data)
+    _, unknown, after = rows(ledger)
+    assert unknown["expected_balance"] is None and not unknown["gap"]
+    assert after["expected_balance"] is None and not after["gap"]
+    assert ledger["summary"]["C00001"]["gaps"] == 0
+    assert ledger["summary"]["C00001"]["closing_balance"] == 1600.0
+
+
+def test_same_second_ordered_by_sms_date():
+    # The withdrawal's table comes later, but its SMS arrived first
+    data = empty_data()
+    data["Deposit"] = [deposit(1, 1000.0, 1500.0, "2024-05-10 10:00:00", 1715328000900)]
+    data["Withdrawal"] = [withdrawal(1, 400.0, 100.0, 500.0, "2024-05-10 10:00:00", 1715328000100)]
+
+    ledger = build_ledger(data)
+    assert ledger["accounts"]["C00001"]["type"] == ["Withdrawal", "Deposit"]
+    assert ledger["summary"]["C00001"]["gaps"] == 0
+
+
+def test_rows_without_account_or_time_are_skipped():
+    data = empty_data()
+    data["Deposit"] = [deposit(1, 1000.0, 1000.0, None)]
+    data["Transfer"] = [dict(send(1, 100.0, 20.0, 880.0, "2024-05-10 12:00:00"), sender_log_id=None)]
+
+    ledger = build_ledger(data)
+    assert ledger["accounts"] == {} and ledger["skipped"] == 2
+
+
+@pytest.mark.parametrize("value, end, expected", [
+    ("2024-05-10", False, "2024-05-10 00:00:00"),
+    ("2024-05-10", True, "2024-05-10 23:59:59"),
+    ("2024-05-10 16:30", True, "2024-05-10 16:30:00"),
+    ("2024-05-10T16:30:58.250", False, "2024-05-10 16:30:58"),
+    ("", False, None)
+])
+def test_parse_bound(value, end, expected):
+    assert parse_bound(value, "to" if end else "from", end=end) == expected
+
+
+@pytest.mark.parametrize("value", ["yesterday", "2024-13-01", "2024-05-10 16:30+02:00"])
+def test_parse_bound_rejects(value):
+    with pytest.raises(ValueError):
+        parse_bound(value, "from")
+
+
+def write_ledger(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(build_ledger(data), f)
+
+
+@pytest.fixture
+def ledger_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(api_ledger, "_ledger", None)
+    data = empty_data()
+    data["Deposit"] = [
+        deposit(1, 1000.0, 1000.0, "2024-05-09 23:59:59"),
+        deposit(2, 1000.0, 2000.0, "2024-05-10 08:00:00"),
+        deposit(3, 1000.0, 3000.0, "2024-05-10 23:59:59"),
+        deposit(4, 1000.0, 4000.0, "2024-05-11 00:00:00")
+    ]
+    path = tmp_path / "balance_ledger.json"
+    write_ledger(path, data)
+    api_ledger.load_ledger(path)
+    return path
+
+
+def test_balance_history_range(ledger_path):
+    history = balance_history(start="2024-05-10", end="2024-05-10")
+    assert [e["transaction_id"] for e in history["entries"]] == ["D00002", "D00003"]
+    assert balance_history("C99999") is None
+    with pytest.raises(ValueError):
+        balance_history(start="10/05/2024")
+
+
+def test_rebuilt_ledger_is_reloaded(ledger_path):
+    assert len(balance_history()["entries"]) == 4
+    data = empty_data()
+    data["Deposit"] = [deposit(1, 1000.0, 1000.0, "2024-05-12 09:00:00")]
+    write_ledger(ledger_path, data)
+    # Some filesystems only keep whole-second mtimes
+    os.utime(ledger_path, ns=(api_ledger._ledger["mtime"] + 10**9,) * 2)
+    assert [e["time_stamp"] for e in balance_history()["entries"]] == ["2024-05-12 09:00:00"]
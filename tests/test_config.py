@@ -0,0 +1,108 @@
+import subprocess
+import sys
+
+import pytest
+
+from etl import config, metrics
+
+
+@pytest.fixture
+def env_file(tmp_path, monkeypatch):
+    # A throwaway .env; load_env is cached, so it is cleared around the test
+    path = tmp_path / ".env"
+    path.write_text("MOMO_TEST_ONLY_IN_FILE=from-file\nMOMO_TEST_BOTH=from-file\nMOMO_PROFILE=cpu\n", encoding="utf-8")
+    monkeypatch.setattr(config, "ENV_PATH", path)
+    for name in ("MOMO_TEST_ONLY_IN_FILE", "MOMO_TEST_BOTH", "MOMO_PROFILE"):
+        monkeypatch.delenv(name, raising=False)
+    config.load_env.cache_clear()
+    yield path
+    config.load_env.cache_clear()
+
+
+def test_importing_the_api_loads_no_driver_or_dotenv():
+    code = "import sys, api.app; print(sorted(m for m in ('mysql.connector', 'dotenv') if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_environment_overrides_env_file(env_file, monkeypatch):
+    monkeypatch.setenv("MOMO_TEST_BOTH", "from-environment")
+    assert config.get("MOMO_TEST_BOTH") == "from-environment"
+    assert config.get("MOMO_TEST_ONLY_IN_FILE") == "from-file"
+    assert config.get("MOMO_TEST_MISSING", "default") == "default"
+
+
+class ListLogger:
+    def __init__(self, lines):
+        self.lines = lines
+
+    def info(self, message):
+        self.lines.append(message)
+
+
+def test_profiling_honours_env_file(env_file, monkeypatch, tmp_path):
+    # MOMO_PROFILE=cpu in .env turns on profiling without touching the environment
+    monkeypatch.setattr(metrics, "LOG_PATH", tmp_path / "etl.log")
+    lines = []
+    monkeypatch.setattr(metrics, "get_logger", lambda: ListLogger(lines))
+    with metrics.profiled("unit"):
+        sum(range(1000))
+    assert len(list(tmp_path.glob("unit-*.prof"))) == 1
+    assert len(list(tmp_path.glob("unit-*.txt"))) == 1
+    assert lines and "kind=cpu" in lines[0]
+
+
+class FakeCursor:
+    def __init__(self, fail):
+        self.fail = fail
+
+    def execute(self, query, params):
+        if self.fail:
+            raise RuntimeError("warm-up query failed")
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, pool, fail):
+        self.pool = pool
+        self.fail = fail
+
+    def cursor(self):
+        return FakeCursor(self.fail)
+
+    def close(self):
+        self.pool.returned += 1
+
+
+class FakePool:
+    pool_size = 3
+
+    def __init__(self):
+        self.handed_out = 0
+        self.returned = 0
+
+    def get_connection(self):
+        self.handed_out += 1
+        # The second connection's warm-up query fails
+        return FakeConnection(self, fail=self.handed_out == 2)
+
+
+def test_prewarm_returns_connections_when_a_query_fails(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(config, "_pool", pool)
+    with pytest.raises(RuntimeError):
+        config.prewarm([("SELECT 1", ())])
+    assert pool.handed_out == pool.returned == 3
+
+
+def test_prewarm_uses_every_pooled_connection(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(FakeConnection, "cursor", lambda self: FakeCursor(False))
+    monkeypatch.setattr(config, "_pool", pool)
+    assert config.prewarm([("SELECT 1", ())]) == 3
+    assert pool.returned == 3
@@ -0,0 +1,28 @@
+import xml.etree.ElementTree as ET
+
+from benchmarks.generate_sms import SmsGenerator, write_backup
+from etl.metrics import Metrics
+from etl.parse_xml import extract_message
+
+
+def test_same_seed_same_backup(tmp_path):
+    write_backup(str(tmp_path / "a.xml"), 500, seed=7)
+    write_backup(str(tmp_path / "b.xml"), 500, seed=7)
+    write_backup(str(tmp_path / "c.xml"), 500, seed=8)
+    a, b, c = ((tmp_path / name).read_bytes() for name in ("a.xml", "b.xml", "c.xml"))
+    assert a == b
+    assert a != c
+
+
+def test_generated_messages_parse_cleanly():
+    # Every generated transaction type is recognised with all of its fields
+    generator = SmsGenerator(seed=3)
+    stats = Metrics()
+    types = set()
+    for _ in range(2000):
+        record = extract_message(ET.fromstring(generator.next_message()).attrib, stats)
+        types.add(record["type"])
+        if record["type"] != "Other":
+            assert record["amount"] is not None and record["time_stamp"] is not None
+    assert types == {"Deposit", "Withdrawal", "Transfer_Send", "Transfer_Receive", "Payment", "Other"}
+    assert stats.counter_values("regex_miss") == []
@@ -0,0 +1,42 @@
+import sqlite3
+
+import pytest
+
+from benchmarks.generate_sms import write_backup
+from benchmarks.run_benchmarks import SQLITE_SCHEMA
+from etl import load_json_to_mysql, parse_xml
+from etl.load_json_to_mysql import TABLE_COLUMNS, load
+
+
+@pytest.fixture(autouse=True)
+def no_etl_log(monkeypatch):
+    # Keep test runs out of data/logs/etl.log
+    monkeypatch.setattr(load_json_to_mysql, "log_stage", lambda stage, **fields: None)
+    monkeypatch.setattr(parse_xml, "log_stage", lambda stage, **fields: None)
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    with open(SQLITE_SCHEMA, "r", encoding="utf-8") as f:
+        conn.executescript(f.read())
+    yield conn
+    conn.close()
+
+
+def table_rows(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_counts_rows_inserted_not_sent(conn, tmp_path):
+    write_backup(str(tmp_path / "momo.xml"), 1500, seed=5)
+    data = parse_xml.parse_file(str(tmp_path / "momo.xml"))
+
+    counts = load(data, conn, "sqlite")
+    assert counts == {table: table_rows(conn, table) for table in TABLE_COLUMNS}
+    assert counts["Payment"] == len(data["Payment"])
+    # Senders of received transfers have no number and are rejected by NOT NULL
+    assert counts["Customer"] < len(data["Customer"])
+
+    # Loading again only hits INSERT OR IGNORE duplicates
+    assert sum(load(data, conn, "sqlite").values()) == 0
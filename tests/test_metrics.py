@@ -0,0 +1,54 @@
+import pytest
+
+from etl.metrics import Histogram, Metrics, format_fields, metric_key
+
+
+def test_histogram_bucket_boundaries():
+    hist = Histogram(buckets=(1, 5, float("inf")))
+    for value in (0.5, 1, 1.01, 5, 7, 10_000):
+        hist.observe(value)
+    snapshot = hist.snapshot()
+    # Bucket bounds are inclusive upper bounds, anything larger lands in +Inf
+    assert snapshot["buckets"] == {"1": 2, "5": 2, "+Inf": 2}
+    assert snapshot["count"] == 6
+    assert snapshot["sum_ms"] == pytest.approx(10_014.51)
+    assert Histogram().snapshot()["avg_ms"] is None
+
+
+def test_observe_records_milliseconds():
+    metrics = Metrics()
+    metrics.observe("request_latency", 0.003, route="/search")
+    hist = metrics.snapshot()["histograms"]["request_latency{route=/search}"]
+    assert hist["sum_ms"] == 3.0 and hist["buckets"]["5"] == 1
+
+
+@pytest.mark.parametrize("fields, line", [
+    ({"stage": "load", "rows": 3}, "stage=load rows=3"),
+    ({"seconds": 0.5}, "seconds=0.5000"),
+    ({"file": "a b.xml"}, 'file="a b.xml"'),
+    ({"name": 'say "hi"'}, r'name="say \"hi\""'),
+    ({"path": "C:\\data", "sql": "a=b"}, r'path="C:\\data" sql="a=b"'),
+    ({"text": "two\nlines", "empty": ""}, r'text="two\nlines" empty=""')
+])
+def test_format_fields_quoting(fields, line):
+    assert format_fields(fields) == line
+
+
+def test_counters_round_trip_between_processes():
+    worker = Metrics()
+    worker.incr("messages", 3, type="Deposit")
+    worker.incr("regex_miss", type="Payment", field="fee")
+    parent = Metrics()
+    parent.incr("messages", 2, type="Deposit")
+
+    parent.merge_counters(worker.export_counters())
+    assert parent.counter_values("messages") == [({"type": "Deposit"}, 5)]
+    assert parent.counter_values("regex_miss") == [({"field": "fee", "type": "Payment"}, 1)]
+
+
+def test_metric_key_sorts_labels():
+    metrics = Metrics()
+    metrics.incr("requests", route="/search", method="GET")
+    metrics.incr("requests", method="GET", route="/search")
+    assert metrics.snapshot()["counters"] == {"requests{method=GET,route=/search}": 2}
+    assert metric_key("rows", ()) == "rows"
@@ -0,0 +1,130 @@
+import queue
+import zipfile
+
+import pytest
+
+from benchmarks.generate_sms import write_backup
+from etl import parse_xml
+from etl.metrics import Metrics
+from etl.parse_xml import CHUNK_SIZE, expand_inputs, extract_message, iter_chunks, open_source, parse_files
+
+PAYMENT = ("TxId: 73214484437. Your payment of 1,000 RWF to Jane Smith 12845 has been completed at 2024-05-10 16:31:39. "
+           "Your new balance: 1,000 RWF. Fee was 0 RWF.")
+
+
+def sms(body, date="1715351499000"):
+    return {"body": body, "date": date, "readable_date": "10 May 2024 4:31:39 PM"}
+
+
+def test_amount_taken_from_message_pattern():
+    stats = Metrics()
+    record = extract_message(sms(PAYMENT), stats)
+    assert record["type"] == "Payment"
+    assert record["amount"] == 1000.0 and record["tx_id"] == "73214484437"
+    assert record["date_ms"] == 1715351499000
+    assert stats.counter_values("regex_miss") == []
+
+
+def test_amount_miss_is_counted_not_guessed():
+    # The USSD code and balance must not be taken as the deposit amount
+    body = "*113*R*A bank deposit of RWF 40000 has been added to your mobile money account. Your NEW BALANCE :40400 RWF."
+    stats = Metrics()
+    record = extract_message(sms(body), stats)
+    assert record["type"] == "Deposit"
+    assert record["amount"] is None and record["new_balance"] == 40400.0
+    assert stats.counter_values("regex_miss") == [({"field": "amount", "type": "Deposit"}, 1)]
+
+
+@pytest.fixture(autouse=True)
+def no_etl_log(monkeypatch):
+    # Keep test runs out of data/logs/etl.log
+    monkeypatch.setattr(parse_xml, "log_stage", lambda stage, **fields: None)
+
+
+@pytest.fixture
+def backups(tmp_path):
+    # The same synthetic backup as plain XML, gzip and a zip member, plus a
+    # second backup larger than one worker chunk
+    write_backup(str(tmp_path / "a.xml"), 300, seed=1)
+    write_backup(str(tmp_path / "a.xml.gz"), 300, seed=1)
+    with zipfile.ZipFile(tmp_path / "a.zip", "w") as zf:
+        zf.write(tmp_path / "a.xml", "export/a.xml")
+        zf.writestr("export/notes.txt", "not a backup")
+    write_backup(str(tmp_path / "b.xml.gz"), CHUNK_SIZE + 150, seed=2)
+    (tmp_path / "README.txt").write_text("not a backup")
+    return tmp_path
+
+
+def test_expand_inputs(backups):
+    a_xml, a_gz, a_zip, b_gz = (str(backups / name) for name in ("a.xml", "a.xml.gz", "a.zip", "b.xml.gz"))
+    expected = [(a_xml, None), (a_gz, None), (a_zip, "export/a.xml"), (b_gz, None)]
+    # Directories and globs skip files that aren't backups
+    assert expand_inputs([str(backups)]) == expected
+    assert expand_inputs([str(backups / "*")]) == expected
+    assert expand_inputs([a_gz, str(backups / "a.*")]) == expected[:3]
+
+
+def test_expand_inputs_errors(backups):
+    with pytest.raises(ValueError):
+        expand_inputs([str(backups / "README.txt")])
+    with pytest.raises(FileNotFoundError):
+        expand_inputs([str(backups / "*.txt")])
+    with pytest.raises(FileNotFoundError):
+        expand_inputs([str(backups / "missing.xml")])
+
+
+def test_compressed_inputs_match_plain_xml(backups):
+    plain = parse_files([(str(backups / "a.xml"), None)])
+    assert sum(len(plain[table]) for table in ("Deposit", "Withdrawal", "Transfer", "Payment")) > 0
+    assert parse_files([(str(backups / "a.xml.gz"), None)]) == plain
+    assert parse_files([(str(backups / "a.zip"), "export/a.xml")]) == plain
+    with open_source(str(backups / "a.xml.gz")) as f, open(backups / "a.xml", "rb") as raw:
+        assert f.read() == raw.read()
+
+
+def test_workers_do_not_change_output(backups):
+    sources = expand_inputs([str(backups)])
+    assert parse_files(sources, workers=3) == parse_files(sources, workers=1)
+
+
+class StubQueue:
+    # Times out once, as if the worker was slow, then holds what it put meanwhile
+    def __init__(self, items):
+        self.items = list(items)
+        self.timed_out = False
+
+    def get(self, timeout=None):
+        if not self.timed_out:
+            self.timed_out = True
+            raise queue.Empty
+        return self.items.pop(0)
+
+    def get_nowait(self):
+        if not self.items:
+            raise queue.Empty
+        return self.items.pop(0)
+
+
+class DoneFuture:
+    def __init__(self, error=None):
+        self.error = error
+
+    def done(self):
+        return True
+
+    def result(self):
+        if self.error:
+            raise self.error
+        return []
+
+
+def test_chunks_queued_after_timeout_are_not_dropped():
+    chunks = StubQueue([["a", "b"], ["c"], None])
+    assert list(iter_chunks(chunks, DoneFuture())) == [["a", "b"], ["c"]]
+
+
+def test_worker_without_end_marker_raises():
+    with pytest.raises(OSError):
+        list(iter_chunks(StubQueue([["a"]]), DoneFuture(OSError("worker died"))))
+    with pytest.raises(RuntimeError):
+        list(iter_chunks(StubQueue([["a"]]), DoneFuture()))
@@ -0,0 +1,26 @@
+import sqlite3
+from argparse import Namespace
+
+import pytest
+
+from benchmarks.run_benchmarks import connect
+
+
+def test_sqlite_path_starts_empty(tmp_path):
+    path = tmp_path / "bench.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE leftover (id INTEGER)")
+    conn.close()
+
+    conn = connect(Namespace(backend="sqlite", sqlite_path=str(path)), str(tmp_path))
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.close()
+    assert "leftover" not in tables and "Customer" in tables
+
+
+def test_sqlite_path_refuses_other_files(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("not a database")
+    with pytest.raises(ValueError):
+        connect(Namespace(backend="sqlite", sqlite_path=str(path)), str(tmp_path))
+    assert path.read_text() == "not a database"
@@ -0,0 +1,113 @@
+import json
+import os
+
+import pytest
+
+from api import search
+from api.search import MAX_LIMIT, search_transactions
+from etl.build_search_index import build_index
+
+
+def transfer(n, name, number):
+    return {
+        "transfer_id": f"T{n:05d}",
+        "receiver_log_id": None,
+        "sender_log_id": "SL00001",
+        "amount": 100.0 * n,
+        "fee": 20.0,
+        "recipient_name": name,
+        "recipient_number": number,
+        "new_balance": 1000.0,
+        "transfer_type": "Send",
+        "time_stamp": f"2024-05-10 10:{n:02d}:00",
+        "tx_id": None
+    }
+
+
+def sample_data():
+    return {
+        "Customer": [{"customer_id": "C00001", "customer_name": "Self", "customer_number": 36521838}],
+        "Agent": [],
+        "Deposit": [],
+        "Withdrawal": [],
+        "Sender_Log": [{"sender_log_id": "SL00001", "customer_id": "C00001", "transaction_type": "Transfer"}],
+        "Receiver_Log": [],
+        "Transfer": [
+            transfer(1, "Jane Smith", 250791666666),
+            transfer(2, "Samuel Carter", 250790777777),
+            transfer(3, "Jane Doe", 250788999999)
+        ],
+        "Payment": [{
+            "payment_id": "P00001",
+            "receiver_log_id": None,
+            "sender_log_id": "SL00001",
+            "amount": 1500.0,
+            "fee": 0.0,
+            "new_balance": 500.0,
+            "time_stamp": "2024-05-10 11:00:00",
+            "payment_type": None,
+            "tx_id": "73214484437"
+        }]
+    }
+
+
+@pytest.fixture
+def index_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(search, "_index", None)
+    path = tmp_path / "search_index.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(build_index(sample_data()), f)
+    search.load_index(path)
+    return path
+
+
+def ids(results):
+    return [doc["transaction_id"] for doc in results]
+
+
+def test_prefix_matches_any_term(index_path):
+    assert ids(search_transactions("jan")) == ["T00001", "T00003"]
+    assert ids(search_transactions("2507907")) == ["T00002"]
+    assert ids(search_transactions("7321")) == ["P00001"]
+
+
+def test_every_word_must_match(index_path):
+    assert ids(search_transactions("jane smi")) == ["T00001"]
+    assert ids(search_transactions("Jane, DOE!")) == ["T00003"]
+    assert search_transactions("jane carter") == []
+
+
+def test_no_words_or_no_match(index_path):
+    assert search_transactions("") == []
+    assert search_transactions("  --  ") == []
+    assert search_transactions("zzz") == []
+
+
+def test_limit_is_clamped(index_path):
+    assert ids(search_transactions("t0000", limit=2)) == ["T00001", "T00002"]
+    assert len(search_transactions("t0000", limit=0)) == 1
+    assert len(search_transactions("t0000", limit=-5)) == 1
+    assert len(search_transactions("t0000", limit=MAX_LIMIT + 50)) == 3
+
+
+def test_terms_sorted_at_load(tmp_path, monkeypatch):
+    # Prefix search must not depend on the key order of the JSON file
+    monkeypatch.setattr(search, "_index", None)
+    index = build_index(sample_data())
+    index["terms"] = dict(reversed(list(index["terms"].items())))
+    path = tmp_path / "search_index.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    search.load_index(path)
+    assert ids(search_transactions("jane")) == ["T00001", "T00003"]
+
+
+def test_rebuilt_index_is_reloaded(index_path):
+    assert ids(search_transactions("linda")) == []
+    data = sample_data()
+    data["Transfer"].append(transfer(4, "Linda Green", 250783456789))
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(build_index(data), f)
+    # Some filesystems only keep whole-second mtimes
+    os.utime(index_path, ns=(search._index["mtime"] + 10**9,) * 2)
+    assert ids(search_transactions("linda")) == ["T00004"]